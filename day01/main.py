@@ -1,5 +1,15 @@
 from pathlib import Path
-from typing import List
+from typing import Any, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+DIAL_SIZE = 100
+DIAL_START = 50
+READ_CHUNK_SIZE = 1 << 20
+
+Turns = npt.NDArray[np.signedinteger[Any]]
+Positions = npt.NDArray[np.int64]
 
 
 def parse(data: List[str]) -> List[int]:
@@ -10,39 +20,98 @@ def parse(data: List[str]) -> List[int]:
     ]
 
 
+def decode_turns(buf: bytes) -> Turns:
+    # Decodes a buffer of complete "R12\n"/"L7\n" lines straight from the bytes,
+    # one vectorized pass per digit column rather than one Python step per line.
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    ends = np.flatnonzero(raw == ord("\n"))
+    if len(raw) and raw[-1] != ord("\n"):
+        ends = np.append(ends, len(raw))
+    starts = np.empty_like(ends)
+    starts[:1] = 0
+    starts[1:] = ends[:-1] + 1
+    nonempty = ends > starts
+    starts = starts[nonempty]
+    ends = ends[nonempty]
+
+    amounts = np.zeros(len(starts), dtype=np.int32)
+    longest = int((ends - starts).max(initial=0))
+    for offset in range(1, longest):
+        idx = starts + offset
+        in_line = idx < ends
+        digits = raw[np.where(in_line, idx, 0)].astype(np.int32) - ord("0")
+        is_digit = in_line & (digits >= 0) & (digits <= 9)
+        amounts = np.where(is_digit, amounts * 10 + digits, amounts)
+
+    return np.where(raw[starts] == ord("R"), amounts, -amounts)
+
+
+def read_turns(path: Path, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Turns]:
+    # Reads the file in fixed-size blocks, holding back any partial last line until
+    # the next block arrives, so memory use doesn't grow with the file.
+    leftover = b""
+    with path.open("rb") as f:
+        while block := f.read(chunk_size):
+            buf = leftover + block
+            cut = buf.rfind(b"\n") + 1
+            leftover = buf[cut:]
+            if cut:
+                yield decode_turns(buf[:cut])
+    if leftover:
+        yield decode_turns(leftover)
+
+
+def dial_positions(turns: Turns, dial: int) -> Positions:
+    # Unwrapped dial positions: element 0 is the starting position and element i is
+    # the position after turn i. Only ever reduced mod DIAL_SIZE by the callers.
+    positions = np.empty(len(turns) + 1, dtype=np.int64)
+    positions[0] = dial
+    np.cumsum(turns, out=positions[1:])
+    positions[1:] += dial
+    return positions
+
+
+def count_stops_at_zero(turns: Turns, dial: int = DIAL_START) -> Tuple[int, int]:
+    positions = dial_positions(turns, dial)
+    stops = int(np.count_nonzero(positions[1:] % DIAL_SIZE == 0))
+    return stops, int(positions[-1] % DIAL_SIZE)
+
+
+def count_passes_zero(turns: Turns, dial: int = DIAL_START) -> Tuple[int, int]:
+    positions = dial_positions(turns, dial)
+    before = positions[:-1]
+    after = positions[1:]
+    # Turning right from p to q passes zero once for every multiple of DIAL_SIZE in
+    # (p, q]; turning left, once for every multiple in [q, p). Shifting the left
+    # turns down by one turns that half-open interval into the same floor division.
+    right = after // DIAL_SIZE - before // DIAL_SIZE
+    left = (before - 1) // DIAL_SIZE - (after - 1) // DIAL_SIZE
+    passes = int(np.where(turns > 0, right, np.where(turns < 0, left, 0)).sum())
+    return passes, int(positions[-1] % DIAL_SIZE)
+
+
+def solve_chunks(chunks: Iterable[Turns]) -> Tuple[int, int]:
+    # Solves both parts over a log of any length, one chunk at a time, carrying the
+    # dial position from the end of each chunk into the next.
+    stops = passes = 0
+    dial = DIAL_START
+    for chunk in chunks:
+        chunk_stops, _ = count_stops_at_zero(chunk, dial)
+        chunk_passes, dial = count_passes_zero(chunk, dial)
+        stops += chunk_stops
+        passes += chunk_passes
+    return stops, passes
+
+
 def part_one(data: List[str]) -> int:
-    turns = parse(data)
-    dial = 50
-    password = 0
-    for turn in turns:
-        dial += turn
-        dial %= 100
-        if dial == 0:
-            password += 1
+    turns = np.array(parse(data), dtype=np.int64)
+    password, _ = count_stops_at_zero(turns)
     return password
 
 
 def part_two(data: List[str]) -> int:
-    turns = parse(data)
-    dial = 50
-    password = 0
-    for turn in turns:
-        # If we start from zero and turn left, divmod will produce 1 just to get the
-        # dial positive again, even though we didn't cross zero.
-        # In this case, adjust the starting dial position to 100 (which is the same mod
-        # 100) so that we don't count this one.
-        if dial == 0 and turn < 0:
-            dial = 100
-
-        password_delta, dial = divmod(dial + turn, 100)
-        password_delta = abs(password_delta)
-
-        # If we turn left and land on exactly zero, divmod won't notice, but it counts.
-        # If we turned right, it will have already counted it.
-        if turn < 0 and dial == 0:
-            password_delta += 1
-
-        password += password_delta
+    turns = np.array(parse(data), dtype=np.int64)
+    password, _ = count_passes_zero(turns)
     return password
 
 
@@ -58,9 +127,27 @@ def test_part_two() -> None:
     assert part_two(data) == 6
 
 
+def test_part_two_edges() -> None:
+    # leaving zero to the left doesn't count, landing on zero from either side does
+    assert part_two(["L50", "L5", "R5", "R100", "L200", "R0"]) == 5
+
+
+def test_read_turns() -> None:
+    with Path("example.txt").open() as f:
+        expected = parse(f.read().splitlines())
+    chunks = list(read_turns(Path("example.txt"), chunk_size=7))
+    assert np.concatenate(chunks).tolist() == expected
+    assert solve_chunks(chunks) == (3, 6)
+
+
+def test_solve_chunks() -> None:
+    with Path("example.txt").open() as f:
+        turns = np.array(parse(f.read().splitlines()), dtype=np.int64)
+    assert solve_chunks(np.array_split(turns, 4)) == (3, 6)
+
+
 if __name__ == "__main__":
-    with Path("input.txt").open() as f:
-        data = f.read().splitlines()
+    password_one, password_two = solve_chunks(read_turns(Path("input.txt")))
 
-    print(f"Part 1: {part_one(data)}")
-    print(f"Part 2: {part_two(data)}")
+    print(f"Part 1: {password_one}")
+    print(f"Part 2: {password_two}")
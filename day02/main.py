@@ -1,7 +1,12 @@
+from array import array
+from bisect import bisect_right
 from dataclasses import dataclass
 from itertools import chain
 from pathlib import Path
-from typing import Iterator, List
+from typing import Iterable, Iterator, List, Sequence
+
+import numpy as np
+import numpy.typing as npt
 
 
 @dataclass(order = True, frozen = True)
@@ -35,30 +40,114 @@ def split_range(r: InclusiveRange) -> Iterator[InclusiveRange]:
         digits += 1
 
 
-def half_range(r: InclusiveRange) -> InclusiveRange:
-    # r.lower and r.upper must be the same number of digits
-    # and must be an even number of digits
-    half_len = num_digits(r.lower) // 2
-    lower = str(r.lower)[:half_len]
-    upper = str(r.upper)[:half_len]
-    return InclusiveRange(int(lower), int(upper))
+def merge_ranges(ranges: List[InclusiveRange]) -> List[InclusiveRange]:
+    merged: List[InclusiveRange] = []
+    for rng in sorted(ranges):
+        if merged and rng.lower <= merged[-1].upper:
+            last = merged.pop()
+            merged.append(InclusiveRange(last.lower, max(last.upper, rng.upper)))
+        else:
+            merged.append(rng)
+    return merged
 
 
-def expand_half_to_invalid(half: int) -> int:
-    # half must be positive
-    return int(f"{half}{half}")
+def pack_bounds(bounds: List[int]) -> Sequence[int]:
+    # Machine integers when the bounds fit, which is almost always; bisect and
+    # NumPy work just as well on the plain list kept for anything wider.
+    try:
+        return array("q", bounds)
+    except OverflowError:
+        return bounds
 
 
-def truncated_range(r: InclusiveRange, sublen: int) -> InclusiveRange:
-    # r.lower and r.upper must be the same number of digits
-    # and must be evenly divisible by sublen
-    lower = str(r.lower)[:sublen]
-    upper = str(r.upper)[:sublen]
-    return InclusiveRange(int(lower), int(upper))
+class RangeSet:
+    # Sorted, non-overlapping inclusive ranges with their bounds packed into arrays,
+    # so membership is a bisect instead of a scan over every range.
+    __slots__ = ("lowers", "uppers")
+
+    lowers: Sequence[int]
+    uppers: Sequence[int]
+
+    def __init__(self, ranges: Iterable[InclusiveRange]) -> None:
+        merged = merge_ranges(list(ranges))
+        self.lowers = pack_bounds([rng.lower for rng in merged])
+        self.uppers = pack_bounds([rng.upper for rng in merged])
 
+    def __contains__(self, n: int) -> bool:
+        idx = bisect_right(self.lowers, n) - 1
+        return idx >= 0 and n <= self.uppers[idx]
 
-def expand_trunc_to_invalid(half: int, repeats: int) -> int:
-    return int(str(half) * repeats)
+    def __len__(self) -> int:
+        return len(self.lowers)
+
+    def __iter__(self) -> Iterator[InclusiveRange]:
+        return map(InclusiveRange, self.lowers, self.uppers)
+
+    def __repr__(self) -> str:
+        return ",".join(repr(rng) for rng in self)
+
+    def contains_many(self, items: npt.NDArray[np.int64]) -> npt.NDArray[np.bool_]:
+        if not self.lowers:
+            return np.zeros(len(items), dtype=np.bool_)
+        idx = np.searchsorted(np.asarray(self.lowers), items, side="right") - 1
+        uppers = np.asarray(self.uppers)[np.maximum(idx, 0)]
+        return np.asarray((idx >= 0) & (items <= uppers), dtype=np.bool_)
+
+    def size(self) -> int:
+        return sum(upper - lower + 1 for lower, upper in zip(self.lowers, self.uppers))
+
+    def intersection(self, other: "RangeSet") -> "RangeSet":
+        overlaps = []
+        i = j = 0
+        while i < len(self) and j < len(other):
+            lower = max(self.lowers[i], other.lowers[j])
+            upper = min(self.uppers[i], other.uppers[j])
+            if lower <= upper:
+                overlaps.append(InclusiveRange(lower, upper))
+            if self.uppers[i] < other.uppers[j]:
+                i += 1
+            else:
+                j += 1
+        return RangeSet(overlaps)
+
+
+def mobius(n: int) -> int:
+    result = 1
+    factor = 2
+    while factor * factor <= n:
+        if n % factor == 0:
+            n //= factor
+            if n % factor == 0:
+                return 0
+            result = -result
+        factor += 1
+    if n > 1:
+        result = -result
+    return result
+
+
+def repeated_block_sum(r: InclusiveRange, block_len: int) -> int:
+    # r.lower and r.upper must be the same number of digits
+    # and that number of digits must be evenly divisible by block_len.
+    # Repeating a block is multiplying it, e.g. 123123 == 123 * 1001, so the blocks
+    # that land inside r are a contiguous run and their sum is an arithmetic series.
+    multiplier: int = (10 ** num_digits(r.lower) - 1) // (10 ** block_len - 1)
+    lowest: int = max(-(-r.lower // multiplier), 10 ** (block_len - 1))
+    highest: int = min(r.upper // multiplier, 10 ** block_len - 1)
+    if lowest > highest:
+        return 0
+    return multiplier * (lowest + highest) * (highest - lowest + 1) // 2
+
+
+def repeated_sum(r: InclusiveRange) -> int:
+    # r.lower and r.upper must be the same number of digits.
+    # A number built from a block of length d is also built from blocks of every
+    # multiple of d that divides the length, so summing over every block length
+    # would count it more than once; Mobius inversion counts it exactly once.
+    rng_len = num_digits(r.lower)
+    return -sum(mobius(rng_len // block_len) * repeated_block_sum(r, block_len)
+                for block_len in range(1, rng_len)
+                if rng_len % block_len == 0)
 
 
 def parse(data: str) -> List[InclusiveRange]:
@@ -68,44 +157,19 @@ def parse(data: str) -> List[InclusiveRange]:
 
 
 def part_one(data: str) -> int:
-    answer = 0
-
-    ranges = parse(data)
+    ranges = RangeSet(parse(data))
     split_ranges = (split_range(r) for r in ranges)
     consolidated = chain.from_iterable(split_ranges)
-    even_ranges = list(filter(lambda r: num_digits(r.lower) % 2 == 0, consolidated))
-
-    for rng in even_ranges:
-        half_rng = half_range(rng)
-        # actually only need to check the edges;
-        # the intermediate values are always within the range
-        for half in range(half_rng.lower, half_rng.upper + 1):
-            invalid = expand_half_to_invalid(half)
-            if rng.contains(invalid):
-                answer += invalid
-
-    return answer
+    even_ranges = filter(lambda r: num_digits(r.lower) % 2 == 0, consolidated)
+    return sum(repeated_block_sum(rng, num_digits(rng.lower) // 2)
+               for rng in even_ranges)
 
 
 def part_two(data: str) -> int:
-    invalid_numbers = set()
-
-    ranges = parse(data)
+    ranges = RangeSet(parse(data))
     split_ranges = (split_range(r) for r in ranges)
-    consolidated = list(chain.from_iterable(split_ranges))
-
-    for rng in consolidated:
-        rng_len = num_digits(rng.lower)
-        substr_lens = filter(lambda x: rng_len % x == 0, range(1, rng_len // 2 + 1))
-        for substr_len in substr_lens:
-            times = rng_len // substr_len
-            trunc_range = truncated_range(rng, substr_len)
-            for trunc in range(trunc_range.lower, trunc_range.upper + 1):
-                invalid = expand_trunc_to_invalid(trunc, times)
-                if rng.contains(invalid):
-                    invalid_numbers.add(invalid)
-
-    return sum(invalid_numbers)
+    consolidated = chain.from_iterable(split_ranges)
+    return sum(repeated_sum(rng) for rng in consolidated)
 
 
 def test_part_one() -> None:
@@ -120,6 +184,11 @@ def test_part_two() -> None:
     assert part_two(data) == 4174379265
 
 
+def test_overlapping_ranges() -> None:
+    assert part_one("11-22,20-33,1111-1111") == 11 + 22 + 33 + 1111
+    assert part_two("11-22,20-33,111-111") == 11 + 22 + 33 + 111
+
+
 if __name__ == "__main__":
     with Path("input.txt").open() as f:
         data = f.read()
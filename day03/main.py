@@ -1,33 +1,116 @@
 from pathlib import Path
-from typing import List
+from typing import Any, List, Optional, Union
 
+import numpy as np
+import numpy.typing as npt
 
-def bank_joltage(bank: str) -> int:
-    first_pos, first = max(enumerate(int(x) for x in iter(bank[:-1])),
-                           key=lambda x: x[1])
-    _, second = max(enumerate(int(x) for x in iter(bank[first_pos+1:])),
-                    key=lambda x: x[1])
-    return first * 10 + second
+MATRIX_BLOCK_ROWS = 1 << 14
 
+Banks = npt.NDArray[np.uint8]
+Keys = npt.NDArray[np.unsignedinteger[Any]]
 
-def bigger_bank_joltage(bank: str, elements: int) -> int:
-    result = 0
-    bank_items = [int(x) for x in iter(bank)]
-    for i in range(elements):
-        holdback = elements - i - 1
-        allowed = len(bank_items) - holdback
-        pos, digit = max(enumerate(bank_items[:allowed]), key=lambda x: x[1])
-        bank_items = bank_items[pos+1:]
-        result = result * 10 + digit
-    return result
+
+def bank_joltage(bank: Union[str, bytes]) -> int:
+    return bigger_bank_joltage(bank, 2)
+
+
+def bigger_bank_joltage(bank: Union[str, bytes], elements: int) -> int:
+    # Single greedy pass: keep the chosen digits in a stack, and whenever a bigger
+    # digit arrives, drop smaller ones off the top for as long as enough digits
+    # remain to still fill every element. Digits are compared as ASCII bytes.
+    digits = bank.encode() if isinstance(bank, str) else bank
+    drops = len(digits) - elements
+    stack = bytearray()
+    for digit in digits:
+        while drops and stack and stack[-1] < digit:
+            stack.pop()
+            drops -= 1
+        stack.append(digit)
+    return int(stack[:elements])
+
+
+def load_banks(data: bytes) -> Optional[Banks]:
+    # One row of digits per bank, straight from the file bytes, when every bank is
+    # the same length and holds only digits; None for ragged input, or for anything
+    # else on the lines, such as "\r" or trailing spaces.
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    width = data.index(b"\n")
+    if width == 0 or len(data) % (width + 1) != 0:
+        return None
+    raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, width + 1)
+    if not (raw[:, width] == ord("\n")).all():
+        return None
+    # anything below "0" wraps around, so a single bound checks both sides
+    banks: Banks = raw[:, :width] - np.uint8(ord("0"))
+    if not (banks <= 9).all():
+        return None
+    return banks
+
+
+def range_max_tables(keys: Keys) -> List[Keys]:
+    # tables[j][r, c] is the largest key in row r over columns [c, c + 2**j)
+    tables = [keys]
+    span = 1
+    while span * 2 <= keys.shape[1]:
+        prev = tables[-1]
+        tables.append(np.maximum(prev[:, :-span], prev[:, span:]))
+        span *= 2
+    return tables
+
+
+def matrix_joltage(banks: Banks, elements: int) -> int:
+    # The same greedy choice as bigger_bank_joltage, made for every bank at once:
+    # each step takes the leftmost largest digit in the window that starts after
+    # the previous pick and leaves room for the remaining elements.
+    # Each digit is packed above its reversed column into a single key, so the
+    # largest key in a window is the leftmost largest digit, and any window is the
+    # max of two overlapping power-of-two spans from the range-max tables.
+    num_banks, width = banks.shape
+    shift = max(1, (width - 1).bit_length())
+    key_type = np.uint16 if shift <= 12 else np.uint64
+    col_mask = (1 << shift) - 1
+    reversed_cols = (col_mask - np.arange(width)).astype(key_type)
+
+    # Per-element digit sums, combined with Python ints at the end so the total is
+    # exact for any number of elements.
+    element_sums = [0] * elements
+    for first in range(0, num_banks, MATRIX_BLOCK_ROWS):
+        block = banks[first:first + MATRIX_BLOCK_ROWS]
+        rows = np.arange(len(block))
+        tables = range_max_tables((block.astype(key_type) << shift) | reversed_cols)
+        start = np.zeros(len(block), dtype=np.intp)
+        for i in range(elements):
+            upper = width - elements + i + 1
+            levels = np.frexp(upper - start)[1] - 1
+            best = np.empty(len(block), dtype=key_type)
+            for level in np.unique(levels):
+                sel = levels == level
+                table = tables[level]
+                best[sel] = np.maximum(table[rows[sel], start[sel]],
+                                       table[rows[sel], upper - (1 << level)])
+            element_sums[i] += int((best >> shift).sum(dtype=np.int64))
+            start = (col_mask - (best & col_mask)).astype(np.intp) + 1
+
+    total = 0
+    for element_sum in element_sums:
+        total = total * 10 + element_sum
+    return total
+
+
+def solve(data: bytes, elements: int) -> int:
+    banks = load_banks(data)
+    if banks is None:
+        return sum(bigger_bank_joltage(bank, elements) for bank in data.split())
+    return matrix_joltage(banks, elements)
 
 
 def part_one(banks: List[str]) -> int:
     return sum(bank_joltage(bank) for bank in banks)
 
 
-def part_two(banks: List[str]) -> int:
-    return sum(bigger_bank_joltage(bank, 12) for bank in banks)
+def part_two(banks: List[str], elements: int = 12) -> int:
+    return sum(bigger_bank_joltage(bank, elements) for bank in banks)
 
 
 def test_part_one() -> None:
@@ -42,9 +125,30 @@ def test_part_two() -> None:
     assert part_two(data) == 3121910778619
 
 
+def test_bigger_bank_joltage() -> None:
+    assert bigger_bank_joltage("818181911112111", 12) == 888911112111
+    assert bigger_bank_joltage(b"9119", 2) == 99
+    assert bigger_bank_joltage("12345", 5) == 12345
+
+
+def test_solve() -> None:
+    with Path("example.txt").open("rb") as f:
+        data = f.read()
+    assert load_banks(data) is not None
+    assert solve(data, 2) == 357
+    assert solve(data, 12) == 3121910778619
+    ragged = b"9119\n12345\n"
+    assert load_banks(ragged) is None
+    assert solve(ragged, 2) == 99 + 45
+    crlf = b"987654321111111\r\n811111111111119\r\n"
+    assert load_banks(crlf) is None
+    assert solve(crlf, 2) == 98 + 89
+    assert solve(crlf, 12) == 987654321111 + 811111111119
+
+
 if __name__ == "__main__":
-    with Path("input.txt").open() as f:
-        data = f.read().splitlines()
+    with Path("input.txt").open("rb") as f:
+        data = f.read()
 
-    print(f"Part 1: {part_one(data)}")
-    print(f"Part 2: {part_two(data)}")
+    print(f"Part 1: {solve(data, 2)}")
+    print(f"Part 2: {solve(data, 12)}")
@@ -1,54 +1,167 @@
+import argparse
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator, List, Tuple
+from typing import Iterable, Iterator, List, Tuple
 
+import numpy as np
+import numpy.typing as npt
 
-def neighbors(rows: List[List[str]], x: int, y: int) -> Iterator[Tuple[int, int, str]]:
-    for iy in range(max(0, y - 1), min(y + 2, len(rows))):
-        row = rows[iy]
-        for ix in range(max(0, x - 1), min(x + 2, len(row))):
-            if ix != x or iy != y:
-                yield ix, iy, row[ix]
+Grid = npt.NDArray[np.bool_]
+Counts = npt.NDArray[np.uint8]
+Cells = npt.NDArray[np.intp]
 
+ROLL_BITS = bytes.maketrans(b"@.", b"10")
 
-def neighbor_values(rows: List[List[str]], x: int, y: int) -> Iterator[str]:
-    for _, _, nval in neighbors(rows, x, y):
-        yield nval
 
+@dataclass
+class PackedGrid:
+    # One arbitrary-precision int per row, with column x stored in bit x, so a
+    # 100k x 100k grid takes about 1.25 GB instead of tens of GB of lists.
+    rows: List[int]
+    width: int
 
-def is_roll(val: str) -> bool:
-    return val == "@"
 
+def load_grid(data: bytes) -> Grid:
+    lines = data.split()
+    raw = np.frombuffer(b"".join(lines), dtype=np.uint8)
+    grid: Grid = raw.reshape(len(lines), -1) == ord("@")
+    return grid
 
-def is_accessible(rows: List[List[str]], x: int, y: int) -> bool:
-    return len(list(filter(is_roll, neighbor_values(rows, x, y)))) < 4
 
+def to_grid(rows: List[List[str]]) -> Grid:
+    return load_grid("\n".join("".join(row) for row in rows).encode())
 
-def part_one(rows: List[List[str]]) -> int:
-    accessible = 0
-    for y, row in enumerate(rows):
-        for x, c in enumerate(row):
-            if is_roll(c) and is_accessible(rows, x, y):
-                accessible += 1
-    return accessible
 
+def neighbor_counts(grid: Grid) -> Counts:
+    # Sum of the 3x3 block around each cell, done as a horizontal then a vertical
+    # sum of shifted slices of the zero-padded grid, minus the cell itself.
+    padded = np.pad(grid, 1).view(np.uint8)
+    across = padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]
+    block = across[:-2] + across[1:-1] + across[2:]
+    counts: Counts = block - grid.view(np.uint8)
+    return counts
 
-def remove_pass(rows: List[List[str]]) -> int:
-    removed = 0
-    for y, row in enumerate(rows):
-        for x, c in enumerate(row):
-            if is_roll(c) and is_accessible(rows, x, y):
-                removed += 1
-                rows[y][x] = "."
-    return removed
 
+def accessible(grid: Grid) -> Grid:
+    return grid & (neighbor_counts(grid) < 4)
 
-def part_two(rows: List[List[str]]) -> int:
+
+def count_accessible(grid: Grid) -> int:
+    return int(np.count_nonzero(accessible(grid)))
+
+
+def removal_passes(grid: Grid) -> Iterator[Cells]:
+    # Yields the (y, x) cells removed by each pass, where a pass removes every roll
+    # that is accessible once the previous pass is gone. Only neighbors of the last
+    # pass can change state, so rather than rescanning the grid, each pass updates
+    # their neighbor counts and checks just those cells.
+    stride = grid.shape[1] + 2
+    rolls = np.pad(grid, 1).ravel()
+    # int8 since the padding cells have their counts decremented but never checked
+    counts = np.pad(neighbor_counts(grid), 1).ravel().astype(np.int8)
+    offsets = np.array([dy * stride + dx
+                        for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                        if dy != 0 or dx != 0])
+
+    frontier = np.flatnonzero(rolls & (counts < 4))
+    while len(frontier):
+        yield np.stack(np.divmod(frontier, stride), axis=1) - 1
+        rolls[frontier] = False
+        touched, hits = np.unique((frontier[:, None] + offsets).ravel(),
+                                  return_counts=True)
+        counts[touched] -= hits.astype(np.int8)
+        frontier = touched[rolls[touched] & (counts[touched] < 4)]
+
+
+def removal_order(grid: Grid) -> Tuple[Cells, Cells]:
+    # Every removed (y, x) cell in order, with the pass number (from 1) of each.
+    passes = list(removal_passes(grid))
+    if not passes:
+        return np.empty((0, 2), dtype=np.intp), np.empty(0, dtype=np.intp)
+    pass_numbers = np.repeat(np.arange(1, len(passes) + 1),
+                             [len(cells) for cells in passes])
+    return np.concatenate(passes), pass_numbers
+
+
+def remove_all(grid: Grid) -> int:
+    return sum(len(cells) for cells in removal_passes(grid))
+
+
+def load_packed(lines: Iterable[bytes]) -> PackedGrid:
+    # Packs a row at a time, from a file opened in binary mode or any other source
+    # of lines, so nothing but the packed rows and the current line is ever held.
+    rows = []
+    width = 0
+    for line in lines:
+        cells = line.strip()
+        if cells:
+            rows.append(int(cells.translate(ROLL_BITS)[::-1], 2))
+            width = max(width, len(cells))
+    return PackedGrid(rows, width)
+
+
+def to_packed(rows: List[List[str]]) -> PackedGrid:
+    return load_packed("".join(row).encode() for row in rows)
+
+
+def popcount(n: int) -> int:
+    return bin(n).count("1")
+
+
+def accessible_row(above: int, row: int, below: int) -> int:
+    # Adds up the eight neighbor masks with bit-sliced counters, so every column
+    # of the row is counted at once, a machine word at a time. Counts of four or
+    # more saturate in the fours bit, which is all the check needs.
+    ones = twos = fours = 0
+    for neighbors in (above << 1, above, above >> 1, row << 1, row >> 1,
+                      below << 1, below, below >> 1):
+        carry = ones & neighbors
+        ones ^= neighbors
+        fours |= twos & carry
+        twos ^= carry
+    return row & ~fours
+
+
+def packed_count_accessible(grid: PackedGrid) -> int:
+    rows = [0, *grid.rows, 0]
+    return sum(popcount(accessible_row(rows[y - 1], rows[y], rows[y + 1]))
+               for y in range(1, len(rows) - 1))
+
+
+def packed_remove_all(grid: PackedGrid) -> int:
+    # Same passes as remove_all, but only rows next to the last pass's removals
+    # can change, so only those are recomputed.
+    rows = [0, *grid.rows, 0]
+    dirty = set(range(1, len(rows) - 1))
     total_removed = 0
-    while True:
-        removed = remove_pass(rows)
-        if removed == 0:
-            return total_removed
-        total_removed += removed
+    while dirty:
+        removals = [(y, accessible_row(rows[y - 1], rows[y], rows[y + 1]))
+                    for y in sorted(dirty)]
+        dirty = set()
+        for y, removed in removals:
+            if removed:
+                rows[y] &= ~removed
+                total_removed += popcount(removed)
+                dirty.update((y - 1, y, y + 1))
+        dirty.discard(0)
+        dirty.discard(len(rows) - 1)
+    return total_removed
+
+
+def part_one(rows: List[List[str]], backend: str = "dense") -> int:
+    if backend == "packed":
+        return packed_count_accessible(to_packed(rows))
+    if backend == "dense":
+        return count_accessible(to_grid(rows))
+    raise ValueError
+
+
+def part_two(rows: List[List[str]], backend: str = "dense") -> int:
+    if backend == "packed":
+        return packed_remove_all(to_packed(rows))
+    if backend == "dense":
+        return remove_all(to_grid(rows))
+    raise ValueError
 
 
 def test_part_one() -> None:
@@ -63,9 +176,53 @@ def test_part_two() -> None:
     assert part_two(data) == 43
 
 
-if __name__ == "__main__":
-    with Path("input.txt").open() as f:
+def test_packed_backend() -> None:
+    with Path("example.txt").open() as f:
         data = [list(line) for line in f.read().splitlines()]
+    assert part_one(data, backend="packed") == 13
+    assert part_two(data, backend="packed") == 43
+    with Path("example.txt").open("rb") as f:
+        grid = load_packed(f)
+    assert grid == to_packed(data)
+    assert packed_count_accessible(grid) == 13
+
+
+def test_neighbor_counts() -> None:
+    grid = load_grid(b"@@.\n@@@\n..@\n")
+    assert neighbor_counts(grid).tolist() == [[3, 4, 3], [3, 5, 3], [2, 4, 2]]
+
+
+def test_removal_order() -> None:
+    with Path("example.txt").open("rb") as f:
+        grid = load_grid(f.read())
+    order, pass_numbers = removal_order(grid)
+    assert len(order) == 43
+    assert np.count_nonzero(pass_numbers == 1) == 13
+    assert grid[order[:, 0], order[:, 1]].all()
+    # each pass only removes rolls accessible once the earlier passes are gone
+    remaining = grid.copy()
+    for number in range(1, pass_numbers[-1] + 1):
+        cells = order[pass_numbers == number]
+        assert accessible(remaining)[cells[:, 0], cells[:, 1]].all()
+        remaining[cells[:, 0], cells[:, 1]] = False
+    assert count_accessible(remaining) == 0
 
-    print(f"Part 1: {part_one(data)}")
-    print(f"Part 2: {part_two(data)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["dense", "packed"], default="dense",
+                        help="grid representation to solve with")
+    args = parser.parse_args()
+
+    if args.backend == "packed":
+        with Path("input.txt").open("rb") as f:
+            packed = load_packed(f)
+
+        print(f"Part 1: {packed_count_accessible(packed)}")
+        print(f"Part 2: {packed_remove_all(packed)}")
+    else:
+        with Path("input.txt").open("rb") as f:
+            grid = load_grid(f.read())
+
+        print(f"Part 1: {count_accessible(grid)}")
+        print(f"Part 2: {remove_all(grid)}")
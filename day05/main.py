@@ -1,6 +1,19 @@
+import argparse
+import io
+import sys
+from array import array
+from bisect import bisect_right
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import numpy.typing as npt
+
+INDEX_MAGIC = int.from_bytes(b"AOC25D05", "little")
+QUERY_CHUNK_SIZE = 1 << 20
+
+Bounds = Union[Sequence[int], npt.NDArray[np.int64]]
 
 
 @dataclass(order = True, frozen = True)
@@ -49,16 +62,124 @@ def merge_ranges(ranges: List[InclusiveRange]) -> List[InclusiveRange]:
     return merged_ranges
 
 
+def pack_bounds(bounds: List[int]) -> Sequence[int]:
+    # Machine integers when the bounds fit, which is almost always; bisect and
+    # NumPy work just as well on the plain list kept for anything wider.
+    try:
+        return array("q", bounds)
+    except OverflowError:
+        return bounds
+
+
+class RangeSet:
+    # Sorted, non-overlapping inclusive ranges with their bounds packed into arrays,
+    # so membership is a bisect instead of a scan over every range.
+    __slots__ = ("lowers", "uppers")
+
+    lowers: Bounds
+    uppers: Bounds
+
+    def __init__(self, ranges: Iterable[InclusiveRange]) -> None:
+        merged = merge_ranges(list(ranges))
+        self.lowers = pack_bounds([rng.lower for rng in merged])
+        self.uppers = pack_bounds([rng.upper for rng in merged])
+
+    def __contains__(self, n: int) -> bool:
+        idx = bisect_right(self.lowers, n) - 1
+        return idx >= 0 and n <= self.uppers[idx]
+
+    def __len__(self) -> int:
+        return len(self.lowers)
+
+    def __iter__(self) -> Iterator[InclusiveRange]:
+        return map(InclusiveRange, self.lowers, self.uppers)
+
+    def __repr__(self) -> str:
+        return ",".join(repr(rng) for rng in self)
+
+    def contains_many(self, items: npt.NDArray[np.int64]) -> npt.NDArray[np.bool_]:
+        if len(self.lowers) == 0:
+            return np.zeros(len(items), dtype=np.bool_)
+        idx = np.searchsorted(np.asarray(self.lowers), items, side="right") - 1
+        uppers = np.asarray(self.uppers)[np.maximum(idx, 0)]
+        return np.asarray((idx >= 0) & (items <= uppers), dtype=np.bool_)
+
+    def size(self) -> int:
+        return sum(int(upper) - int(lower) + 1
+                   for lower, upper in zip(self.lowers, self.uppers))
+
+    def save(self, path: Path) -> None:
+        # Index file layout, all little-endian int64:
+        # magic, range count, lower bounds, upper bounds.
+        header = np.array([INDEX_MAGIC, len(self)], dtype=np.int64)
+        lowers = np.asarray(self.lowers, dtype=np.int64)
+        uppers = np.asarray(self.uppers, dtype=np.int64)
+        np.concatenate([header, lowers, uppers]).astype("<i8").tofile(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "RangeSet":
+        # The bounds stay memory-mapped, so loading costs nothing up front and
+        # the pages are shared between every process querying the same index.
+        data = np.memmap(path, dtype="<i8", mode="r")
+        if len(data) < 2 or data[0] != INDEX_MAGIC or len(data) != 2 + 2 * data[1]:
+            raise ValueError
+        count = int(data[1])
+        ranges = cls.__new__(cls)
+        ranges.lowers = data[2:2 + count]
+        ranges.uppers = data[2 + count:]
+        return ranges
+
+    def intersection(self, other: "RangeSet") -> "RangeSet":
+        overlaps = []
+        i = j = 0
+        while i < len(self) and j < len(other):
+            lower = max(self.lowers[i], other.lowers[j])
+            upper = min(self.uppers[i], other.uppers[j])
+            if lower <= upper:
+                overlaps.append(InclusiveRange(lower, upper))
+            if self.uppers[i] < other.uppers[j]:
+                i += 1
+            else:
+                j += 1
+        return RangeSet(overlaps)
+
+
 def part_one(data: Input) -> int:
-    fresh = 0
-    for item in data.items:
-        if any(rng.contains(item) for rng in data.ranges):
-            fresh += 1
-    return fresh
+    fresh = RangeSet(data.ranges)
+    items = np.array(data.items, dtype=np.int64)
+    return int(np.count_nonzero(fresh.contains_many(items)))
 
 
 def part_two(data: Input) -> int:
-    return sum(rng.size() for rng in merge_ranges(data.ranges))
+    return RangeSet(data.ranges).size()
+
+
+def read_items(items: BinaryIO,
+               chunk_size: int = QUERY_CHUNK_SIZE) -> Iterator[npt.NDArray[np.int64]]:
+    leftover = b""
+    while block := items.read(chunk_size):
+        buf = leftover + block
+        cut = buf.rfind(b"\n") + 1
+        leftover = buf[cut:]
+        if cut:
+            yield np.fromstring(buf[:cut], dtype=np.int64, sep=" ")
+    if leftover.strip():
+        yield np.fromstring(leftover, dtype=np.int64, sep=" ")
+
+
+def query(fresh: RangeSet, items: BinaryIO, out: Optional[BinaryIO] = None) -> int:
+    # Answers each item ID with a "1" (fresh) or "0" line on out, if given,
+    # and returns the number of fresh items.
+    total = 0
+    for batch in read_items(items):
+        mask = fresh.contains_many(batch)
+        total += int(np.count_nonzero(mask))
+        if out is not None:
+            lines = np.empty((len(mask), 2), dtype=np.uint8)
+            lines[:, 0] = np.where(mask, ord("1"), ord("0"))
+            lines[:, 1] = ord("\n")
+            out.write(lines.tobytes())
+    return total
 
 
 def parse(data: str) -> Input:
@@ -89,9 +210,64 @@ def test_check_parse() -> None:
     assert(len(data.items) == 6)
 
 
-if __name__ == "__main__":
-    with Path("input.txt").open() as f:
+def test_range_set() -> None:
+    ranges = RangeSet([InclusiveRange(10, 14), InclusiveRange(1, 3),
+                       InclusiveRange(12, 20), InclusiveRange(2, 5)])
+    assert list(ranges) == [InclusiveRange(1, 5), InclusiveRange(10, 20)]
+    assert 5 in ranges
+    assert 7 not in ranges
+    assert ranges.contains_many(np.array([0, 1, 7, 20, 21])).tolist() == \
+        [False, True, False, True, False]
+    assert ranges.size() == 16
+    other = RangeSet([InclusiveRange(4, 11), InclusiveRange(19, 30)])
+    assert list(ranges.intersection(other)) == \
+        [InclusiveRange(4, 5), InclusiveRange(10, 11), InclusiveRange(19, 20)]
+
+
+def test_index_round_trip(tmp_path: Path) -> None:
+    with Path("example.txt").open() as f:
         data = parse(f.read())
+    index_path = tmp_path / "ranges.idx"
+    RangeSet(data.ranges).save(index_path)
+    fresh = RangeSet.load(index_path)
+    assert list(fresh) == list(RangeSet(data.ranges))
+    items = io.BytesIO(b"\n".join(str(x).encode() for x in data.items))
+    out = io.BytesIO()
+    assert query(fresh, items, out) == 3
+    assert out.getvalue() == b"0\n1\n0\n1\n1\n0\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command")
+    index_parser = commands.add_parser(
+        "index", help="compile the ranges in input.txt into an index file")
+    index_parser.add_argument("index", type=Path)
+    query_parser = commands.add_parser(
+        "query", help="check item IDs, one per line, against an index file")
+    query_parser.add_argument("index", type=Path)
+    query_parser.add_argument("items", type=Path, nargs="?",
+                              help="file of item IDs (default: stdin)")
+    query_parser.add_argument("--count", action="store_true",
+                              help="only print the number of fresh items")
+    args = parser.parse_args()
+
+    if args.command == "index":
+        with Path("input.txt").open() as f:
+            RangeSet(parse(f.read()).ranges).save(args.index)
+    elif args.command == "query":
+        fresh = RangeSet.load(args.index)
+        out = None if args.count else sys.stdout.buffer
+        if args.items is None:
+            total = query(fresh, sys.stdin.buffer, out)
+        else:
+            with args.items.open("rb") as items:
+                total = query(fresh, items, out)
+        if args.count:
+            print(total)
+    else:
+        with Path("input.txt").open() as f:
+            data = parse(f.read())
 
-    print(f"Part 1: {part_one(data)}")
-    print(f"Part 2: {part_two(data)}")
+        print(f"Part 1: {part_one(data)}")
+        print(f"Part 2: {part_two(data)}")
@@ -1,7 +1,27 @@
 import math
-from itertools import groupby
+import mmap
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Any, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+SPACE = ord(" ")
+INT64_DIGITS = 18
+READ_WINDOW = 1 << 16
+
+Bytes = npt.NDArray[np.uint8]
+# int64, or object (Python ints) when a number has too many digits for int64
+Values = npt.NDArray[Any]
+Indices = npt.NDArray[np.intp]
+
+
+@dataclass(frozen=True)
+class Worksheet:
+    # The raw bytes of the worksheet, padded with spaces to a rectangle.
+    numbers: Bytes
+    ops: Bytes
 
 
 def solve(op: str, values: Iterable[int]) -> int:
@@ -12,56 +32,204 @@ def solve(op: str, values: Iterable[int]) -> int:
     raise ValueError
 
 
-def part_one(data: List[List[str]]) -> int:
-    grand_total = 0
-    ops = data[-1]
-    values = data[:-1]
-    for col in range(len(ops)):
-        problem_values = (int(v[col]) for v in values)
-        grand_total += solve(ops[col], problem_values)
-    return grand_total
-
-
-def part_two(ops: List[str], numbergrid: List[List[str]]) -> int:
-    grand_total = 0
-    transposed_grid = (list(row) for row in zip(*numbergrid))
-    raw_numbers_str = ("".join(x) for x in transposed_grid)
-    raw_numbers_int = (int(x) if not x.isspace() else None for x in raw_numbers_str)
-    number_groups = [list(group) for key, group in
-                     groupby(raw_numbers_int, lambda x: x is None) if not key]
-    assert(len(number_groups) == len(ops))
-    for op, numbers in zip(ops, number_groups):
-        # there shouldn't be any None here, this is just making type hints happy
-        grand_total += solve(op, (x for x in numbers if x is not None))
-    return grand_total
-
-
-def parse_one(data: str) -> List[List[str]]:
-    return [line.split() for line in data.splitlines()]
-
-
-def parse_two(data: str) -> Tuple[List[str], List[List[str]]]:
+def problem_starts(sheet: Worksheet) -> Indices:
+    # Problems are separated by columns that are blank in every number row.
+    blank = (sheet.numbers == SPACE).all(axis=0)
+    after_blank = np.concatenate(([True], blank[:-1]))
+    return np.flatnonzero(~blank & after_blank)
+
+
+def problem_ops(sheet: Worksheet, starts: Indices) -> Bytes:
+    # Ops are matched to problems in order, wherever they sit in the op row.
+    ops: Bytes = sheet.ops[sheet.ops != SPACE]
+    if len(ops) != len(starts):
+        raise ValueError
+    return ops
+
+
+def place_values(digits: Bytes, places: Values) -> Values:
+    # digits * 10 ** places, falling back to Python ints for numbers too long for
+    # int64
+    if places.max(initial=0) >= INT64_DIGITS:
+        values: Values = digits.astype(object) * 10 ** places.astype(object)
+    else:
+        values = digits.astype(np.int64) * 10 ** places
+    return values
+
+
+def bit_lengths(values: Values) -> Values:
+    # Rounding through float64 can only overestimate, which errs on the safe side.
+    return np.frexp(values.astype(np.float64))[1].astype(np.int64)
+
+
+def grand_total(ops: Bytes, values: Values, starts: Indices) -> int:
+    # Solves every problem at once, where problem i's values are the slice of
+    # values from starts[i] up to the next start. Sums and products are done in
+    # int64, then redone with Python ints for any problem that could overflow.
+    lengths = np.diff(np.append(starts, len(values)))
+    bits = bit_lengths(values)
+    is_sum = ops == ord("+")
+    if not (is_sum | (ops == ord("*"))).all():
+        raise ValueError
+
+    totals = np.where(is_sum,
+                      np.add.reduceat(values, starts),
+                      np.multiply.reduceat(values, starts))
+    if values.dtype == object:
+        return sum(totals.tolist())
+
+    overflow = np.where(is_sum,
+                        np.maximum.reduceat(bits, starts) + bit_lengths(lengths),
+                        np.add.reduceat(bits, starts)) > 62
+
+    results: List[int] = totals.tolist()
+    for i in np.flatnonzero(overflow):
+        problem = values[starts[i]:starts[i] + lengths[i]].tolist()
+        results[i] = solve(chr(ops[i]), problem)
+    return sum(results)
+
+
+def part_one(sheet: Worksheet) -> int:
+    # Each number row holds one number per problem, read left to right: weight each
+    # digit by the number of digits to its right within the same problem.
+    starts = problem_starts(sheet)
+    width = sheet.numbers.shape[1]
+    digits = sheet.numbers - np.uint8(ord("0"))
+    is_digit = digits < 10
+    # digits at or after each column, with a zero column past the end
+    after = np.zeros((len(digits), width + 1), dtype=np.int64)
+    after[:, :width] = np.cumsum(is_digit[:, ::-1], axis=1)[:, ::-1]
+    problem = np.maximum(np.searchsorted(starts, np.arange(width), side="right") - 1, 0)
+    ends = np.append(starts[1:], width)
+    place = np.where(is_digit, after[:, :width] - after[:, ends[problem]] - 1, 0)
+    weighted = np.where(is_digit, place_values(digits, place), 0)
+    numbers = np.add.reduceat(weighted, starts, axis=1)
+
+    ops = problem_ops(sheet, starts)
+    num_rows = len(numbers)
+    return grand_total(ops, numbers.T.ravel(), np.arange(len(starts)) * num_rows)
+
+
+def part_two(sheet: Worksheet) -> int:
+    # Each column holds one number, read top to bottom: weight each digit by the
+    # number of digits below it in the column.
+    starts = problem_starts(sheet)
+    digits = sheet.numbers - np.uint8(ord("0"))
+    is_digit = digits < 10
+    below = np.cumsum(is_digit[::-1], axis=0)[::-1] - is_digit
+    numbers = np.where(is_digit, place_values(digits, below), 0).sum(axis=0)
+
+    ops = problem_ops(sheet, starts)
+    in_problem = np.flatnonzero(~(sheet.numbers == SPACE).all(axis=0))
+    return grand_total(ops, numbers[in_problem],
+                       np.searchsorted(in_problem, starts))
+
+
+def parse(data: str) -> Worksheet:
     lines = data.splitlines()
-    ops = lines[-1].split()
-    numbergrid = [list(line) for line in lines[:-1]]
-    return ops, numbergrid
+    width = max(len(line) for line in lines)
+    grid = np.full((len(lines), width), SPACE, dtype=np.uint8)
+    for row, line in zip(grid, lines):
+        row[:len(line)] = np.frombuffer(line.encode(), dtype=np.uint8)
+    return Worksheet(grid[:-1], grid[-1])
+
+
+def line_bounds(mm: mmap.mmap) -> List[Tuple[int, int]]:
+    bounds = []
+    start = 0
+    while start < len(mm):
+        end = mm.find(b"\n", start)
+        if end < 0:
+            end = len(mm)
+        bounds.append((start, end))
+        start = end + 1
+    return bounds
+
+
+def read_columns(mm: mmap.mmap, bounds: List[Tuple[int, int]],
+                 begin: int, end: int) -> Bytes:
+    # Columns [begin, end) of every line, padded with spaces past the line's end.
+    block = np.full((len(bounds), end - begin), SPACE, dtype=np.uint8)
+    for row, (start, stop) in zip(block, bounds):
+        count = min(stop - start, end) - begin
+        if count > 0:
+            row[:count] = np.frombuffer(mm, dtype=np.uint8, count=count,
+                                        offset=start + begin)
+    return block
+
+
+def read_worksheets(path: Path, window: int = READ_WINDOW) -> Iterator[Worksheet]:
+    # Walks every line of a very wide worksheet in lockstep, a window of columns at
+    # a time, and yields runs of whole problems as soon as they're complete. A
+    # window is cut where its last problem starts, and only grows when a single
+    # problem is wider than the window, so memory follows the widest problem rather
+    # than the line length.
+    with path.open("rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = line_bounds(mm)
+        width = max(stop - start for start, stop in bounds)
+        begin = 0
+        end = window
+        while begin < width:
+            block = read_columns(mm, bounds, begin, min(end, width))
+            blank = block == SPACE
+            if end >= width:
+                if not blank.all():
+                    yield Worksheet(block[:-1], block[-1])
+                return
+            # An op sits at or before its problem's first digit, so the last op that
+            # follows a blank column starts the problem that may still be incomplete.
+            numbers_blank = blank[:-1].all(axis=0)
+            cuts = np.flatnonzero(~blank[-1, 1:] & numbers_blank[:-1]) + 1
+            if len(cuts):
+                cut = int(cuts[-1])
+                yield Worksheet(block[:-1, :cut], block[-1, :cut])
+                begin += cut
+                end = begin + window
+            elif blank.all():
+                begin = end
+                end = begin + window
+            else:
+                end += window
+
+
+def stream_totals(path: Path, window: int = READ_WINDOW) -> Tuple[int, int]:
+    part_one_total = part_two_total = 0
+    for sheet in read_worksheets(path, window):
+        part_one_total += part_one(sheet)
+        part_two_total += part_two(sheet)
+    return part_one_total, part_two_total
 
 
 def test_part_one() -> None:
     with Path("example.txt").open() as f:
-        data = parse_one(f.read())
+        data = parse(f.read())
     assert part_one(data) == 4277556
 
 
 def test_part_two() -> None:
     with Path("example.txt").open() as f:
-        ops, numbergrid = parse_two(f.read())
-    assert part_two(ops, numbergrid) == 3263827
+        data = parse(f.read())
+    assert part_two(data) == 3263827
+
+
+def test_stream_totals() -> None:
+    for window in (1, 3, 5, 100):
+        assert stream_totals(Path("example.txt"), window) == (4277556, 3263827)
+
+
+def test_overflow_fallback() -> None:
+    data = parse("99999 99999 1\n99999 99999 2\n99999 99999 3\n99999 99999 4\n"
+                 "*     +     *")
+    assert part_one(data) == 99999 ** 4 + 4 * 99999 + 24
+    assert part_two(data) == 9999 ** 5 + 5 * 9999 + 1234
+    data = parse("\n".join(["12345678901234567890"] * 20 + ["*"]))
+    assert part_one(data) == 12345678901234567890 ** 20
+    assert part_two(data) == math.prod(int(str(d) * 20) for d in "12345678901234567890")
 
 
 if __name__ == "__main__":
-    with Path("input.txt").open() as f:
-        data = f.read()
+    part_one_total, part_two_total = stream_totals(Path("input.txt"))
 
-    print(f"Part 1: {part_one(parse_one(data))}")
-    print(f"Part 2: {part_two(*parse_two(data))}")
+    print(f"Part 1: {part_one_total}")
+    print(f"Part 2: {part_two_total}")
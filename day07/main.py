@@ -1,53 +1,86 @@
 from pathlib import Path
-from typing import Dict, List
+from typing import List
+
+import numpy as np
+import numpy.typing as npt
+
+Limbs = npt.NDArray[np.uint64]
+
+LIMB_BITS = 48
+LIMB_MASK = (1 << LIMB_BITS) - 1
+# A row at most triples a limb, and 3 ** 9 times a carried limb still fits in uint64.
+CARRY_EVERY = 9
+SPLITTER_BITS = bytes(ord("1") if c == ord("^") else ord("0") for c in range(256))
+
+
+def splitter_mask(row: bytes) -> int:
+    # bit i is set when column i holds a splitter
+    return int(row.translate(SPLITTER_BITS)[::-1], 2)
+
+
+def popcount(n: int) -> int:
+    return bin(n).count("1")
 
 
 def part_one(data: List[str]) -> int:
     initial_line = data[0]
-    data = data[1:]
     start_pos = initial_line.index("S")
+    splitters = [splitter_mask(row.encode()) for row in data[1:] if row]
     num_splits = 0
-    beam_cols = {start_pos}
-
-    for row in data:
-        splitter_locs = {i for i, c in enumerate(row) if c == "^"}
-        new_beam_cols = set()
-        for col in beam_cols:
-            if col in splitter_locs:
-                new_beam_cols.add(col + 1)
-                new_beam_cols.add(col - 1)
-                num_splits += 1
-            else:
-                new_beam_cols.add(col)
-        beam_cols = new_beam_cols
+    beams = 1 << start_pos
+
+    # A beam that would leave the grid on the left is dropped by the shift; one
+    # leaving on the right lands past every splitter, so neither changes the count.
+    for splitter_row in splitters:
+        hit = beams & splitter_row
+        num_splits += popcount(hit)
+        beams = (beams & ~splitter_row) | (hit << 1) | (hit >> 1)
 
     return num_splits
 
 
-def addsert(d: Dict[int, int], k: int, v: int) -> None:
-    if k not in d:
-        d[k] = 0
-    d[k] += v
+def splitter_cols(row: bytes, width: int) -> npt.NDArray[np.bool_]:
+    # with an extra column on either side, for timelines that leave the grid
+    cols = np.zeros(width + 2, dtype=np.bool_)
+    cols[1:len(row) + 1] = np.frombuffer(row, dtype=np.uint8) == ord("^")
+    return cols
+
+
+def carry_limbs(limbs: Limbs) -> Limbs:
+    # Moves each limb's overflow up into the next one. A single pass leaves every
+    # limb only just over LIMB_BITS, which is all the headroom the next rows need.
+    # The top limb is always kept empty so nothing carries out of it.
+    overflow = limbs >> np.uint64(LIMB_BITS)
+    limbs &= np.uint64(LIMB_MASK)
+    limbs[:, 1:] += overflow[:, :-1]
+    if limbs[:, -1].any():
+        limbs = np.hstack([limbs, np.zeros_like(limbs[:, :1])])
+    return limbs
 
 
 def part_two(data: List[str]) -> int:
     initial_line = data[0]
-    data = data[1:]
     start_pos = initial_line.index("S")
-    timelines = {start_pos: 1}
+    rows = [row.encode() for row in data[1:]]
+    width = max((len(row) for row in rows), default=len(initial_line))
+
+    # Counts reach hundreds of digits, so each column's count is split into
+    # base 2**LIMB_BITS limbs, one column's limbs per row of the array.
+    limbs = np.zeros((width + 2, 2), dtype=np.uint64)
+    limbs[start_pos + 1, 0] = 1
+
+    for i, row in enumerate(rows):
+        split_cols = np.flatnonzero(splitter_cols(row, width))
+        hit = limbs[split_cols]
+        limbs[split_cols] = 0
+        limbs[split_cols + 1] += hit
+        limbs[split_cols - 1] += hit
+        if i % CARRY_EVERY == CARRY_EVERY - 1:
+            limbs = carry_limbs(limbs)
 
-    for row in data:
-        splitter_locs = {i for i, c in enumerate(row) if c == "^"}
-        new_timelines: Dict[int, int] = {}
-        for col, count in timelines.items():
-            if col in splitter_locs:
-                addsert(new_timelines, col + 1, count)
-                addsert(new_timelines, col - 1, count)
-            else:
-                addsert(new_timelines, col, count)
-        timelines = new_timelines
+    return sum(int(limb.sum(dtype=object)) << (LIMB_BITS * i)
+               for i, limb in enumerate(limbs.T))
 
-    return sum(timelines.values())
 
 def test_part_one() -> None:
     with Path("example.txt").open() as f:
@@ -55,12 +88,27 @@ def test_part_one() -> None:
     assert part_one(data) == 21
 
 
+def test_splitter_mask() -> None:
+    assert splitter_mask(b"^..^.^") == 0b101001
+
+
 def test_part_two() -> None:
     with Path("example.txt").open() as f:
         data = f.read().splitlines()
     assert part_two(data) == 40
 
 
+def test_many_timelines() -> None:
+    # every beam hits a splitter on every row, so the timelines double each row
+    depth = 200
+    width = 2 * depth + 1
+    data = ["." * depth + "S" + "." * depth]
+    data.extend("".join("^" if (col + row) % 2 == 0 else "." for col in range(width))
+                for row in range(depth))
+    assert part_one(data) == depth * (depth + 1) // 2
+    assert part_two(data) == 2 ** depth
+
+
 if __name__ == "__main__":
     with Path("input.txt").open() as f:
         data = f.read().splitlines()
@@ -1,12 +1,33 @@
+import heapq
 import math
 from dataclasses import dataclass
-from itertools import product
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional, Set, Tuple
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+from scipy.sparse import coo_array
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
+from scipy.spatial import Delaunay, QhullError
+
+DIMENSIONS = 3
+EDGE_BLOCK = 1 << 20
+# below this, or when the boxes are too degenerate to triangulate, part two just
+# walks every pair in order
+MIN_TRIANGULATED = 16
+SIMPLEX_EDGES = [[0, 1], [0, 2], [0, 3], [1, 2], [1, 3], [2, 3]]
+COORD_SEPARATORS = bytes.maketrans(b"\n", b",")
+
+Columns = npt.NDArray[np.int64]
+Distances = npt.NDArray[np.int64]
+Indices = npt.NDArray[np.intp]
+Edges = Tuple[Distances, Indices, Indices]
 
 
 @dataclass(frozen=True)
 class Point:
+    __slots__ = ("x", "y", "z")
     x: int
     y: int
     z: int
@@ -17,65 +38,221 @@ class Point:
                   (self.z - other.z) ** 2)
 
 
-def find_and_remove(circuits: List[Set[int]], box: int) -> Optional[Set[int]]:
-    for i in range(len(circuits)):
-        if box in circuits[i]:
-            to_return = circuits[i]
-            circuits.pop(i)
-            return to_return
-    return None
+@dataclass(frozen=True)
+class PointCloud:
+    # Boxes as one contiguous int64 column per coordinate, shape (DIMENSIONS, n),
+    # so the distance kernels run over whole columns instead of Point objects.
+    columns: Columns
 
+    def __len__(self) -> int:
+        return int(self.columns.shape[1])
 
-def add_circuit(circuits: List[Set[int]], distances: List[Tuple[float, int, int]]) \
-        -> Tuple[int, int]:
-    _, left, right = distances.pop()
-    new_circuit = {left, right}
-    left_set = find_and_remove(circuits, left)
-    if left_set:
-        new_circuit = new_circuit.union(left_set)
-    right_set = find_and_remove(circuits, right)
-    if right_set:
-        new_circuit = new_circuit.union(right_set)
-    circuits.append(new_circuit)
-    return left, right
+    def __getitem__(self, i: int) -> Point:
+        return Point(*self.columns[:, i].tolist())
 
+    def squared_distance(self, left: Union[int, Indices],
+                         right: Union[int, Indices]) -> Distances:
+        diff = self.columns[:, left] - self.columns[:, right]
+        d2: Distances = (diff * diff).sum(axis=0)
+        return d2
 
-def part_one(data: List[str], num_connections: int, num_solution_circuits: int) -> int:
-    junction_boxes = [Point(*[int(x) for x in line.split(",")]) for line in data]
-    distances = {(left, right): junction_boxes[left].distance(junction_boxes[right])
-                 for (left, right)
-                 in product(range(len(junction_boxes)), repeat = 2)
-                 if left < right}
 
-    sorted_distances = sorted([(distance, left, right)
-                               for (left, right), distance
-                               in distances.items()],
-                               key = lambda x: x[0], reverse = True)
-    circuits: List[Set[int]] = []
-    for _ in range(num_connections):
-        _ = add_circuit(circuits, sorted_distances)
+class DisjointSet:
+    # Circuits as a union-find forest over box indices, with path compression and
+    # union by size, tracking each circuit's size and the number of circuits.
+    def __init__(self, n: int) -> None:
+        self.parent = list(range(n))
+        self.size = [1] * n
+        self.count = n
 
-    sorted_circuits = sorted(circuits, key = lambda x: len(x), reverse = True)
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
 
-    return math.prod(len(x) for x in sorted_circuits[:num_solution_circuits])
+    def union(self, a: int, b: int) -> bool:
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        self.count -= 1
+        return True
 
+    def largest(self, n: int) -> List[int]:
+        roots = (i for i, parent in enumerate(self.parent) if i == parent)
+        return heapq.nlargest(n, (self.size[root] for root in roots))
 
-def part_two(data: List[str]) -> int:
-    junction_boxes = [Point(*[int(x) for x in line.split(",")]) for line in data]
-    distances = {(left, right): junction_boxes[left].distance(junction_boxes[right])
-                 for (left, right)
-                 in product(range(len(junction_boxes)), repeat = 2)
-                 if left < right}
-
-    sorted_distances = sorted([(distance, left, right)
-                               for (left, right), distance
-                               in distances.items()],
-                               key = lambda x: x[0], reverse = True)
-    circuits: List[Set[int]] = []
+
+def load_cloud(data: bytes) -> PointCloud:
+    # "x,y,z" lines parsed in one pass over the bytes, as a single comma-separated
+    # run of numbers.
+    values = np.fromstring(data.strip().translate(COORD_SEPARATORS),
+                           dtype=np.int64, sep=",")
+    if len(values) % DIMENSIONS:
+        raise ValueError
+    return PointCloud(np.ascontiguousarray(values.reshape(-1, DIMENSIONS).T))
+
+
+def to_cloud(data: List[str]) -> PointCloud:
+    return load_cloud("\n".join(data).encode())
+
+
+def nearest_edges(cloud: PointCloud, lower: int, count: int) -> Edges:
+    # The count shortest pairs (left < right) whose squared distance is at least
+    # lower, found a block of rows at a time so that memory is bounded by the block
+    # size and count, never by the number of pairs. Ties at the longest distance
+    # returned are broken arbitrarily.
+    n = len(cloud)
+    columns = cloud.columns
+    block_rows = max(1, EDGE_BLOCK // max(n, 1))
+    best_d2 = np.empty(0, dtype=np.int64)
+    best_left = np.empty(0, dtype=np.intp)
+    best_right = np.empty(0, dtype=np.intp)
+    # once count candidates are in hand, anything longer than all of them is skipped
+    upper = np.iinfo(np.int64).max
+    for start in range(0, n - 1, block_rows):
+        stop = min(start + block_rows, n - 1)
+        diff = columns[:, start:stop, None] - columns[:, None, start + 1:]
+        d2 = np.einsum("ijk,ijk->jk", diff, diff)
+        offsets = np.arange(n - start - 1) - np.arange(stop - start)[:, None]
+        left, right = np.nonzero((offsets >= 0) & (d2 >= lower) & (d2 <= upper))
+        best_d2 = np.concatenate([best_d2, d2[left, right]])
+        best_left = np.concatenate([best_left, left + start])
+        best_right = np.concatenate([best_right, right + start + 1])
+        if len(best_d2) > count:
+            keep = np.argpartition(best_d2, count - 1)[:count]
+            best_d2 = best_d2[keep]
+            best_left = best_left[keep]
+            best_right = best_right[keep]
+            upper = int(best_d2.max())
+    return best_d2, best_left, best_right
+
+
+def shortest_edges(cloud: PointCloud, batch: int) -> Iterator[Tuple[int, int]]:
+    # Every pair of boxes, closest first, without ever holding all of them. Each
+    # refill takes the next batch of shortest pairs and hands out only those
+    # strictly shorter than the longest in the batch, since pairs tied with that
+    # one may have been left out; the next refill starts from that distance.
+    # Equal distances come out highest index first, as pops from the end of a
+    # stable sort of every pair did.
+    lower = 0
     while True:
-        left, right = add_circuit(circuits, sorted_distances)
-        if len(circuits) == 1 and len(circuits[0]) == len(junction_boxes):
-            return junction_boxes[left].x * junction_boxes[right].x
+        d2, left, right = nearest_edges(cloud, lower, batch)
+        exhausted = len(d2) < batch
+        if not exhausted:
+            upper = d2.max()
+            shorter = d2 < upper
+            if not shorter.any():
+                batch *= 2
+                continue
+            d2, left, right = d2[shorter], left[shorter], right[shorter]
+            lower = int(upper)
+        order = np.lexsort((-right, -left, d2))
+        yield from zip(left[order].tolist(), right[order].tolist())
+        if exhausted:
+            return
+        batch *= 2
+
+
+def delaunay_edges(cloud: PointCloud) -> Indices:
+    # Every edge of a Delaunay triangulation, as (left, right) rows with left < right.
+    n = len(cloud)
+    simplices = Delaunay(cloud.columns.T.astype(np.float64)).simplices
+    edges = np.sort(simplices[:, SIMPLEX_EDGES].reshape(-1, 2), axis=1)
+    keys = np.unique(edges[:, 0].astype(np.int64) * n + edges[:, 1])
+    return np.stack(np.divmod(keys, n), axis=1).astype(np.intp)
+
+
+def final_connection(cloud: PointCloud) -> Optional[Tuple[int, int]]:
+    # The connection that joins the last two circuits, without walking every pair.
+    # Connecting closest pairs first builds a minimum spanning tree, and its last
+    # connection is the longest tree edge, so only tree edges matter, and a
+    # Euclidean minimum spanning tree always lies within the Delaunay triangulation.
+    #
+    # Ties for that longest distance W are settled the way the full walk would:
+    # every pair shorter than W has already been joined, and any pair of length W
+    # still joining two circuits then has nothing in its diametral sphere, which
+    # makes it a Delaunay edge too. Those are taken highest index first.
+    #
+    # Boxes at the same position are joined first at distance zero, so each is
+    # represented by its highest index, which is the copy the full walk would
+    # reach first.
+    #
+    # None if the boxes are too degenerate to triangulate.
+    order = np.lexsort(cloud.columns[::-1])
+    ordered = cloud.columns[:, order]
+    first = np.ones(len(cloud), dtype=bool)
+    first[1:] = (ordered[:, 1:] != ordered[:, :-1]).any(axis=0)
+    unique = PointCloud(ordered[:, first])
+    inverse = np.empty(len(cloud), dtype=np.intp)
+    inverse[order] = np.cumsum(first) - 1
+    reps = np.zeros(len(unique), dtype=np.intp)
+    np.maximum.at(reps, inverse, np.arange(len(cloud)))
+
+    try:
+        edges = delaunay_edges(unique)
+    except QhullError:
+        return None
+    d2 = unique.squared_distance(edges[:, 0], edges[:, 1])
+    graph = coo_array((d2.astype(np.float64), (edges[:, 0], edges[:, 1])),
+                      shape=(len(unique), len(unique)))
+    tree = coo_array(minimum_spanning_tree(graph))
+    if len(tree.data) != len(unique) - 1:
+        return None
+    longest = int(tree.data.max())
+
+    shorter = tree.data < longest
+    forest = coo_array((tree.data[shorter], (tree.row[shorter], tree.col[shorter])),
+                       shape=tree.shape)
+    _, circuit = connected_components(forest, directed=False)
+
+    ties = edges[(d2 == longest) &
+                 (circuit[edges[:, 0]] != circuit[edges[:, 1]])]
+    ties = np.sort(reps[ties], axis=1)
+    ties = ties[np.lexsort((-ties[:, 1], -ties[:, 0]))]
+    circuits = DisjointSet(int(circuit.max()) + 1)
+    last = (0, 0)
+    for left, right in ties.tolist():
+        if circuits.union(int(circuit[inverse[left]]), int(circuit[inverse[right]])):
+            last = (left, right)
+    return last
+
+
+def connect_closest(cloud: PointCloud, num_connections: int,
+                    num_solution_circuits: int) -> int:
+    circuits = DisjointSet(len(cloud))
+    for left, right in islice(shortest_edges(cloud, num_connections + 1),
+                              num_connections):
+        circuits.union(left, right)
+
+    return math.prod(circuits.largest(num_solution_circuits))
+
+
+def connect_all(cloud: PointCloud) -> int:
+    connection = final_connection(cloud) if len(cloud) >= MIN_TRIANGULATED else None
+    if connection is not None:
+        left, right = connection
+        return cloud[left].x * cloud[right].x
+    circuits = DisjointSet(len(cloud))
+    for left, right in shortest_edges(cloud, 4 * len(cloud)):
+        if circuits.union(left, right) and circuits.count == 1:
+            return cloud[left].x * cloud[right].x
+    raise ValueError
+
+
+def part_one(data: List[str], num_connections: int, num_solution_circuits: int) -> int:
+    return connect_closest(to_cloud(data), num_connections, num_solution_circuits)
+
+
+def part_two(data: List[str]) -> int:
+    return connect_all(to_cloud(data))
 
 
 def test_part_one() -> None:
@@ -90,9 +267,37 @@ def test_part_two() -> None:
     assert part_two(data) == 25272
 
 
+def test_shortest_edges() -> None:
+    with Path("example.txt").open("rb") as f:
+        cloud = load_cloud(f.read())
+    edges = list(shortest_edges(cloud, 3))
+    assert len(edges) == len(cloud) * (len(cloud) - 1) // 2
+    left, right = np.array(edges).T
+    distances = cloud.squared_distance(left, right)
+    assert (np.diff(distances) >= 0).all()
+
+
+def test_final_connection() -> None:
+    with Path("example.txt").open("rb") as f:
+        cloud = load_cloud(f.read())
+    connection = final_connection(cloud)
+    assert connection is not None
+    left, right = connection
+    assert cloud[left].x * cloud[right].x == 25272
+
+
+def test_point_cloud() -> None:
+    cloud = load_cloud(b"162,817,812\n57,618,57\n-906,360,560\n")
+    assert len(cloud) == 3
+    assert cloud[2] == Point(-906, 360, 560)
+    distances = cloud.squared_distance(np.array([0, 0, 1]), np.array([1, 2, 2]))
+    expected = [cloud[a].distance(cloud[b]) ** 2 for a, b in [(0, 1), (0, 2), (1, 2)]]
+    assert distances.tolist() == [round(d2) for d2 in expected]
+
+
 if __name__ == "__main__":
-    with Path("input.txt").open() as f:
-        data = f.read().splitlines()
+    with Path("input.txt").open("rb") as f:
+        cloud = load_cloud(f.read())
 
-    print(f"Part 1: {part_one(data, 1000, 3)}")
-    print(f"Part 2: {part_two(data)}")
+    print(f"Part 1: {connect_closest(cloud, 1000, 3)}")
+    print(f"Part 2: {connect_all(cloud)}")
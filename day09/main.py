@@ -1,9 +1,20 @@
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from itertools import chain, combinations, pairwise, product
+from itertools import accumulate, chain, pairwise
 from pathlib import Path
 
+import numpy as np
+import numpy.typing as npt
 
-@dataclass(frozen=True)
+DIMENSIONS = 2
+COORD_SEPARATORS = bytes.maketrans(b"\n", b",")
+
+type Columns = npt.NDArray[np.int64]
+type Areas = npt.NDArray[np.int64]
+type Indices = npt.NDArray[np.intp]
+
+
+@dataclass(frozen=True, slots=True)
 class Point:
     x: int
     y: int
@@ -12,9 +23,124 @@ class Point:
         return (abs(self.x - other.x) + 1) * (abs(self.y - other.y) + 1)
 
 
+@dataclass(frozen=True)
+class PointCloud:
+    # Red tiles as one contiguous int64 column per coordinate, shape
+    # (DIMENSIONS, n), so the area kernel runs over whole columns instead of
+    # Point objects.
+    columns: Columns
+
+    def __len__(self) -> int:
+        return int(self.columns.shape[1])
+
+    def __getitem__(self, i: int) -> Point:
+        return Point(*self.columns[:, i].tolist())
+
+    def rectangle_area(self, left: int | Indices, right: int | Indices) -> Areas:
+        sides = np.abs(self.columns[:, left] - self.columns[:, right]) + 1
+        areas: Areas = sides[0] * sides[1]
+        return areas
+
+
 type Line = tuple[Point, Point]
 
 
+@dataclass(frozen=True)
+class Segments:
+    # Polygon edges of one orientation, sorted by the coordinate they hold fixed,
+    # each spanning lo..hi along the other axis. Over that order sits a merge sort
+    # tree, heap-numbered from 1 with the edges as its leaves: each node has the
+    # lo ends of the edges below it in sorted order, and the running max of their
+    # hi ends in that order.
+    fixed: list[int]
+    lo: list[list[int]]
+    reach: list[list[int]]
+
+    def crosses(self, fixed_a: int, fixed_b: int, along_a: int, along_b: int) -> bool:
+        # Whether any edge strictly between the rectangle's two sides overlaps its
+        # interior along the other axis. The edges between the sides fall under
+        # O(log n) nodes, and each node answers with one bisect: of its edges
+        # starting below the interior's far end, the one reaching furthest must
+        # pass its near end. No edge is looked at on its own.
+        leaves = len(self.lo) // 2
+        start = bisect_right(self.fixed, min(fixed_a, fixed_b)) + leaves
+        stop = bisect_left(self.fixed, max(fixed_a, fixed_b)) + leaves
+        along_lo = min(along_a, along_b)
+        along_hi = max(along_a, along_b)
+        while start < stop:
+            if start & 1:
+                if self.reaches(start, along_lo, along_hi):
+                    return True
+                start += 1
+            if stop & 1:
+                stop -= 1
+                if self.reaches(stop, along_lo, along_hi):
+                    return True
+            start //= 2
+            stop //= 2
+        return False
+
+    def reaches(self, node: int, along_lo: int, along_hi: int) -> bool:
+        starting = bisect_left(self.lo[node], along_hi)
+        return starting > 0 and self.reach[node][starting - 1] > along_lo
+
+
+@dataclass(frozen=True)
+class SegmentIndex:
+    # The polygon's edges, built once and shared by every candidate rectangle.
+    vertical: Segments
+    horizontal: Segments
+
+    @classmethod
+    def from_cloud(cls, cloud: PointCloud) -> "SegmentIndex":
+        starts = cloud.columns
+        ends = np.roll(starts, -1, axis=1)
+        same = starts == ends
+        # As in line_intersects_rectangle, only horizontal or vertical edges.
+        if not (same[0] | same[1]).all():
+            raise ValueError
+        return cls(
+            vertical=sorted_segments(starts[0], starts[1], ends[1], same[0]),
+            horizontal=sorted_segments(starts[1], starts[0], ends[0], ~same[0]),
+        )
+
+    def crosses(self, a: Point, b: Point) -> bool:
+        return (self.vertical.crosses(a.x, b.x, a.y, b.y) or
+                self.horizontal.crosses(a.y, b.y, a.x, b.x))
+
+
+def sorted_segments(fixed: Columns, start: Columns, end: Columns,
+                    mask: npt.NDArray[np.bool_]) -> Segments:
+    order = np.argsort(fixed[mask])
+    los = np.minimum(start, end)[mask][order].tolist()
+    his = np.maximum(start, end)[mask][order].tolist()
+    leaves = 1 << max(len(los) - 1, 0).bit_length()
+    spans: list[list[tuple[int, int]]] = [[] for _ in range(2 * leaves)]
+    for leaf, span in enumerate(zip(los, his, strict=True)):
+        spans[leaves + leaf] = [span]
+    for node in range(leaves - 1, 0, -1):
+        spans[node] = sorted(spans[2 * node] + spans[2 * node + 1])
+    return Segments(
+        fixed=fixed[mask][order].tolist(),
+        lo=[[lo for lo, _ in node] for node in spans],
+        reach=[list(accumulate((hi for _, hi in node), max)) for node in spans],
+    )
+
+
+def load_cloud(data: bytes) -> PointCloud:
+    # "x,y" lines parsed in one pass over the bytes, as a single comma-separated
+    # run of numbers.
+    values = np.fromstring(data.strip().translate(COORD_SEPARATORS),
+                           dtype=np.int64, sep=",")
+    if len(values) % DIMENSIONS:
+        raise ValueError
+    return PointCloud(np.ascontiguousarray(values.reshape(-1, DIMENSIONS).T))
+
+
+def to_cloud(data: list[str]) -> PointCloud:
+    return load_cloud("\n".join(data).encode())
+
+
 def line_intersects_rectangle(a: Point, b: Point, line: Line) -> bool:
     # This input happens to have only horizontal or vertical lines,
     # and we assume that property (so we check it here).
@@ -46,28 +172,106 @@ def is_valid_rectangle(a: Point, b: Point, lines: list[Line]) -> bool:
     return not any(line_intersects_rectangle(a, b, line) for line in lines)
 
 
-def part_one(data: list[str]) -> int:
-    points = [Point(*[int(x) for x in line.split(",")]) for line in data]
-    return max(a.rectangle_area(b) for a, b in product(points, repeat = 2))
+def new_lows(ys: Columns) -> npt.NDArray[np.bool_]:
+    # Which values are strictly lower than every value before them.
+    lows = np.ones(len(ys), dtype=bool)
+    lows[1:] = ys[1:] < np.minimum.accumulate(ys)[:-1]
+    return lows
 
 
-def part_two(data: list[str]) -> int:
-    points = [Point(*[int(x) for x in line.split(",")]) for line in data]
-    lines = list(pairwise(chain(points, [points[0]])))
+def staircase(columns: Columns) -> Columns:
+    # The lower-left staircase: the points with no other point at or below and at
+    # or left of them, in order of x ascending and so of y descending. In x order,
+    # those are the points lower than everything before them, keeping only the
+    # last, and so lowest, of any that share an x.
+    by_x = np.argsort(columns[0])
+    lows = columns[:, by_x[new_lows(columns[1, by_x])]]
+    last = np.ones(lows.shape[1], dtype=bool)
+    last[:-1] = lows[0, 1:] != lows[0, :-1]
+    stairs: Columns = lows[:, last]
+    return stairs
+
+
+def chain_areas(lower: Columns, upper: Columns, rows: Indices,
+                cols: Indices) -> Areas:
+    # Rectangles from lower[rows] up and right to upper[cols]. Pairs where the
+    # upper corner is below and left of the lower one are scored negative, which
+    # keeps the best column for each row moving rightward as the row does.
+    dx = upper[0, cols] - lower[0, rows] + 1
+    dy = upper[1, cols] - lower[1, rows] + 1
+    areas: Areas = np.where((dx < 0) & (dy < 0), -dx * dy, dx * dy)
+    return areas
 
-    candidates = sorted(
-        ((a.rectangle_area(b), a, b) for a, b in combinations(points, 2)),
-        key=lambda x: x[0],
-        reverse=True,
-    )
 
-    for area, a, b in candidates:
-        if is_valid_rectangle(a, b, lines):
-            return area
+def chain_max_area(lower: Columns, upper: Columns) -> int:
+    # The largest rectangle from the lower-left staircase to the upper-right one.
+    # The best partner for each lower corner never moves left as the lower corner
+    # moves right, so each middle row's best column splits the search for the rows
+    # either side. All segments of a level are searched in one vectorized pass.
+    best = 0
+    lo = np.zeros(1, dtype=np.intp)
+    hi = np.array([lower.shape[1] - 1], dtype=np.intp)
+    col_lo = np.zeros(1, dtype=np.intp)
+    col_hi = np.array([upper.shape[1] - 1], dtype=np.intp)
+    while len(lo):
+        mid = (lo + hi) // 2
+        widths = col_hi - col_lo + 1
+        offsets = np.zeros(len(widths), dtype=np.intp)
+        np.cumsum(widths[:-1], out=offsets[1:])
+        rows = np.repeat(mid, widths)
+        cols = np.arange(int(widths.sum())) - np.repeat(offsets - col_lo, widths)
+        areas = chain_areas(lower, upper, rows, cols)
+        top = np.maximum.reduceat(areas, offsets)
+        best = max(best, int(top.max()))
+        is_top = areas == np.repeat(top, widths)
+        first = np.minimum.reduceat(np.where(is_top, np.arange(len(areas)), len(areas)),
+                                    offsets)
+        split = cols[first]
+
+        left = lo < mid
+        right = mid < hi
+        lo, hi, col_lo, col_hi = (
+            np.concatenate([lo[left], mid[right] + 1]),
+            np.concatenate([mid[left] - 1, hi[right]]),
+            np.concatenate([col_lo[left], split[right]]),
+            np.concatenate([split[left], col_hi[right]]),
+        )
+    return best
+
+
+def largest_rectangle(cloud: PointCloud) -> int:
+    # A largest rectangle can always be stretched to corners that are extreme in
+    # both directions: on the lower-left and upper-right staircases, or, flipping
+    # y, on the upper-left and lower-right ones. Only those are searched.
+    flip = np.array([[1], [-1]])
+    best = 0
+    for columns in (cloud.columns, cloud.columns * flip):
+        best = max(best, chain_max_area(staircase(columns),
+                                        -staircase(-columns)[:, ::-1]))
+    return best
+
+
+def largest_valid_rectangle(cloud: PointCloud) -> int:
+    points = [cloud[i] for i in range(len(cloud))]
+    edges = SegmentIndex.from_cloud(cloud)
+
+    left, right = np.triu_indices(len(cloud), 1)
+    areas = cloud.rectangle_area(left, right)
+    for i in np.argsort(-areas, kind="stable").tolist():
+        if not edges.crosses(points[left[i]], points[right[i]]):
+            return int(areas[i])
 
     return 0
 
 
+def part_one(data: list[str]) -> int:
+    return largest_rectangle(to_cloud(data))
+
+
+def part_two(data: list[str]) -> int:
+    return largest_valid_rectangle(to_cloud(data))
+
+
 def test_part_one() -> None:
     with Path("example.txt").open() as f:
         data = f.read().splitlines()
@@ -80,9 +284,39 @@ def test_part_two() -> None:
     assert part_two(data) == 24
 
 
+def test_point_cloud() -> None:
+    with Path("example.txt").open("rb") as f:
+        cloud = load_cloud(f.read())
+    left, right = np.triu_indices(len(cloud), 1)
+    expected = [cloud[a].rectangle_area(cloud[b])
+                for a, b in zip(left.tolist(), right.tolist(), strict=True)]
+    assert cloud.rectangle_area(left, right).tolist() == expected
+
+
+def test_segment_index() -> None:
+    with Path("example.txt").open("rb") as f:
+        cloud = load_cloud(f.read())
+    points = [cloud[i] for i in range(len(cloud))]
+    lines = list(pairwise(chain(points, [points[0]])))
+    edges = SegmentIndex.from_cloud(cloud)
+    for a in points:
+        for b in points:
+            assert edges.crosses(a, b) != is_valid_rectangle(a, b, lines)
+
+
+def test_largest_rectangle() -> None:
+    # a circle of corners puts every point on some staircase
+    angles = np.linspace(0, 2 * np.pi, 200, endpoint=False)
+    columns = np.round(1000 * np.stack([np.cos(angles), np.sin(angles)]))
+    cloud = PointCloud(columns.astype(np.int64))
+    everything = np.arange(len(cloud))
+    pairs = cloud.rectangle_area(everything[:, None], everything[None, :])
+    assert largest_rectangle(cloud) == pairs.max()
+
+
 if __name__ == "__main__":
-    with Path("input.txt").open() as f:
-        data = f.read().splitlines()
+    with Path("input.txt").open("rb") as f:
+        cloud = load_cloud(f.read())
 
-    print(f"Part 1: {part_one(data)}")
-    print(f"Part 2: {part_two(data)}")
+    print(f"Part 1: {largest_rectangle(cloud)}")
+    print(f"Part 2: {largest_valid_rectangle(cloud)}")
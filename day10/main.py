@@ -1,11 +1,63 @@
-import re
-from dataclasses import dataclass
+import argparse
+import heapq
+import json
+import math
+import signal
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from functools import partial
+from itertools import pairwise
 from pathlib import Path
+from types import FrameType
+from typing import BinaryIO
 
 import numpy as np
+import numpy.typing as npt
 from bitarray import frozenbitarray
 from scipy.optimize import Bounds, LinearConstraint, milp
 
+# above this many lights a flat visited table gets too big, and the solver works
+# from the buttons instead
+BFS_MAX_LIGHTS = 24
+# breadth-first search and the null-space walk are only used while their work
+# stays under this many steps
+SEARCH_MAX_STEPS = 1 << 20
+# up to this many lights, part one keeps a table of every light state per wiring
+TABLE_MAX_LIGHTS = 16
+UNREACHABLE = 255
+CACHE_SIZE = 4096
+# the light tables are bounded by their total size instead, up to 512 of the
+# largest
+TABLE_CACHE_BYTES = 1 << 25
+# past this many free variables in a joltage system, the search is left to MILP
+MAX_FREE_VARIABLES = 3
+# more batches than workers, so a worker that draws quick machines picks up more
+BATCHES_PER_JOB = 4
+# the lazy reader parses this many bytes at a time
+PARSE_BLOCK = 1 << 20
+# diagram bits gathered per pass, as many as a signed int64 holds
+WORD_BITS = 63
+
+
+type Wiring = tuple[int, tuple[int, ...]]
+type Bytes = npt.NDArray[np.uint8]
+type Values = npt.NDArray[np.int64]
+type Indices = npt.NDArray[np.intp]
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledMachine:
+    # What the solvers work from: the diagram and each button as masks with light i
+    # in bit i, as read straight from a MachineStore or compiled from a Machine.
+    lights: int
+    width: int
+    buttons: list[int]
+    joltage: list[int]
+
 
 @dataclass
 class Machine:
@@ -13,35 +65,214 @@ class Machine:
     buttons: list[list[int]]
     joltage: list[int]
 
+    def compile(self) -> CompiledMachine:
+        return CompiledMachine(
+            lights=bitmask(i for i, state in enumerate(self.target_lights) if state),
+            width=len(self.target_lights),
+            buttons=[bitmask(button) for button in self.buttons],
+            joltage=self.joltage,
+        )
 
-def parse_input(data: str) -> list[Machine]:
-    machines = []
 
-    for line in data.strip().splitlines():
-        if not line.strip() or "[" not in line:
-            continue
+@dataclass(frozen=True)
+class MachineStore:
+    # Machines as flat columns. Each diagram is a bitmask int with its width. The
+    # buttons are CSR-style: one flat run of light indices, cut into buttons by
+    # button_starts, and those buttons cut into machines by machine_buttons, with
+    # each button's lights also as a mask. The joltage targets are one flat run
+    # cut by joltage_starts.
+    lights: list[int]
+    widths: Indices
+    light_indices: Values
+    button_starts: Indices
+    button_masks: list[int]
+    machine_buttons: Indices
+    joltage: Values
+    joltage_starts: Indices
+
+    def __len__(self) -> int:
+        return len(self.lights)
+
+    def __getitem__(self, i: int) -> Machine:
+        first, last = self.machine_buttons[i:i + 2].tolist()
+        starts = self.button_starts[first:last + 1].tolist()
+        indices = self.light_indices[starts[0]:starts[-1]].tolist()
+        offset = starts[0]
+        lo, hi = self.joltage_starts[i:i + 2].tolist()
+        return Machine(
+            target_lights=frozenbitarray(diagram(self.lights[i], int(self.widths[i]))),
+            buttons=[indices[a - offset:b - offset] for a, b in pairwise(starts)],
+            joltage=self.joltage[lo:hi].tolist(),
+        )
+
+    def __iter__(self) -> Iterator[Machine]:
+        # every column turned into lists once, rather than per machine
+        widths = self.widths.tolist()
+        indices = self.light_indices.tolist()
+        button_starts = self.button_starts.tolist()
+        machine_buttons = self.machine_buttons.tolist()
+        joltage = self.joltage.tolist()
+        joltage_starts = self.joltage_starts.tolist()
+        for i, lights in enumerate(self.lights):
+            buttons = button_starts[machine_buttons[i]:machine_buttons[i + 1] + 1]
+            yield Machine(
+                target_lights=frozenbitarray(diagram(lights, widths[i])),
+                buttons=[indices[a:b] for a, b in pairwise(buttons)],
+                joltage=joltage[joltage_starts[i]:joltage_starts[i + 1]],
+            )
+
+    def compiled(self) -> Iterator[CompiledMachine]:
+        # straight from the columns, without building a Machine on the way
+        widths = self.widths.tolist()
+        machine_buttons = self.machine_buttons.tolist()
+        joltage = self.joltage.tolist()
+        joltage_starts = self.joltage_starts.tolist()
+        for i, lights in enumerate(self.lights):
+            yield CompiledMachine(
+                lights=lights,
+                width=widths[i],
+                buttons=self.button_masks[machine_buttons[i]:machine_buttons[i + 1]],
+                joltage=joltage[joltage_starts[i]:joltage_starts[i + 1]],
+            )
+
+
+def diagram(lights: int, width: int) -> str:
+    # bit i of the mask as character i, for frozenbitarray
+    return format(lights, f"0{width}b")[::-1] if width else ""
+
+
+@dataclass
+class Failure:
+    index: int
+    reason: str
+
 
-        diagram_match = re.search(r"\[([.#]+)\]", line)
-        target_lights = frozenbitarray()
-        if diagram_match:
-            target_lights = frozenbitarray([char == "#"
-                                            for char in diagram_match.group(1)])
+def load_machines(data: bytes) -> MachineStore:
+    # One pass over the bytes for every machine at once. The bytes that place
+    # everything else, the start of each number, each "(", "{" and "[", and each
+    # line break, are picked out in file order. A number then belongs to the
+    # latest "(" or "{" before it, as its button's light or its machine's joltage,
+    # and to the machine of the latest "[" before that, if it's on the same line.
+    raw = np.frombuffer(data, dtype=np.uint8)
+    diagrams = np.flatnonzero(raw == ord("["))
+    closes = np.flatnonzero(raw == ord("]"))
+    if (len(closes) != len(diagrams) or (closes < diagrams).any() or
+            (closes[:-1] > diagrams[1:]).any()):
+        raise ValueError
 
-        button_matches = re.findall(r"\(([\d,]+)\)", line)
-        buttons = [[int(x) for x in match.split(",")] for match in button_matches]
+    digits = (raw >= ord("0")) & (raw <= ord("9"))
+    firsts = digits.copy()
+    firsts[1:] &= ~digits[:-1]
+    lasts = digits.copy()
+    lasts[:-1] &= ~digits[1:]
+    events = np.flatnonzero(firsts | (raw == ord("(")) | (raw == ord("{")) |
+                            (raw == ord("[")) | (raw == ord("\n")))
+    kinds = raw[events]
+    last_line = latest(kinds == ord("\n"))
+    last_diagram = latest(kinds == ord("["))
+    last_opener = latest((kinds == ord("(")) | (kinds == ord("{")))
+    # anything on a line without a diagram of its own is skipped, as are blank lines
+    on_machine = last_diagram > last_line
+    buttons = (kinds == ord("(")) & on_machine
+    machine = np.cumsum(kinds == ord("[")) - 1
+    button = np.cumsum(buttons) - 1
 
-        joltage_match = re.search(r"\{([\d,]+)\}", line)
-        joltage = []
-        if joltage_match:
-            joltage = [int(x) for x in joltage_match.group(1).split(",")]
+    numbers = np.flatnonzero(firsts[events])
+    values = read_numbers(raw, events[numbers], np.flatnonzero(lasts) + 1)
+    placed = on_machine[numbers] & (last_opener[numbers] > last_diagram[numbers])
+    opened_by = kinds[last_opener[numbers]]
+    is_light = placed & (opened_by == ord("("))
+    is_joltage = placed & (opened_by == ord("{"))
+    widths = closes - diagrams - 1
+    joltage_starts = segment_starts(machine[numbers[is_joltage]], len(diagrams))
+    light_button = button[numbers[is_light]]
+    # indices past every light and joltage counter touch nothing, and would only
+    # widen the masks
+    reach = np.maximum(widths, np.diff(joltage_starts))[machine[numbers[is_light]]]
+    touching = values[is_light] < reach
+    return MachineStore(
+        lights=diagram_masks(raw, diagrams, closes),
+        widths=widths,
+        light_indices=values[is_light],
+        button_starts=segment_starts(light_button, int(buttons.sum())),
+        button_masks=gather_masks(light_button[touching], values[is_light][touching],
+                                  int(buttons.sum())),
+        machine_buttons=segment_starts(machine[buttons], len(diagrams)),
+        joltage=values[is_joltage],
+        joltage_starts=joltage_starts,
+    )
+
+
+def latest(flags: npt.NDArray[np.bool_]) -> Indices:
+    # For each position, the last flagged position at or before it, or -1.
+    marks: Indices = np.maximum.accumulate(np.where(flags, np.arange(len(flags)), -1))
+    return marks
+
+
+def read_numbers(raw: Bytes, starts: Indices, ends: Indices) -> Values:
+    # The digits raw[starts[i]:ends[i]] of every number, a digit place at a time,
+    # each place only over the numbers that are that long.
+    values = raw[starts].astype(np.int64) - ord("0")
+    longer = np.flatnonzero(ends - starts > 1)
+    place = 1
+    while len(longer):
+        values[longer] = values[longer] * 10 + raw[starts[longer] + place] - ord("0")
+        place += 1
+        longer = longer[ends[longer] - starts[longer] > place]
+    return values
+
+
+def segment_starts(owners: Indices, count: int) -> Indices:
+    # CSR offsets for items listed in order of their owner: owner i's items are
+    # starts[i]:starts[i + 1].
+    starts = np.zeros(count + 1, dtype=np.intp)
+    np.cumsum(np.bincount(owners, minlength=count), out=starts[1:])
+    return starts
+
+
+def diagram_masks(raw: Bytes, diagrams: Indices, closes: Indices) -> list[int]:
+    # light i of each diagram as bit i of an int
+    lit = np.flatnonzero(raw == ord("#"))
+    owner = np.searchsorted(diagrams, lit) - 1
+    inside = (owner >= 0) & (lit < closes[owner])
+    lit = lit[inside]
+    owner = owner[inside]
+    return gather_masks(owner, lit - diagrams[owner] - 1, len(diagrams))
 
-        machines.append(Machine(
-            target_lights=target_lights,
-            buttons=buttons,
-            joltage=joltage,
-        ))
 
-    return machines
+def gather_masks(owners: Indices, bits: Indices | Values, count: int) -> list[int]:
+    # Bit bits[i] of mask owners[i], for owners in ascending order, OR-ed together
+    # a 63-bit word of every mask at a time, so that masks of any width fit.
+    masks = [0] * count
+    for word in range(int(bits.max()) // WORD_BITS + 1 if len(bits) else 0):
+        in_word = np.flatnonzero(bits // WORD_BITS == word)
+        if not len(in_word):
+            continue
+        owner = owners[in_word]
+        firsts = np.flatnonzero(np.diff(owner, prepend=-1))
+        words = np.zeros(count, dtype=np.int64)
+        words[owner[firsts]] = np.bitwise_or.reduceat(
+            np.left_shift(1, bits[in_word] % WORD_BITS), firsts)
+        shift = word * WORD_BITS
+        masks = [mask | value << shift for mask, value in zip(masks, words.tolist(),
+                                                              strict=True)]
+    return masks
+
+
+def iter_machines(stream: BinaryIO,
+                  block_size: int = PARSE_BLOCK) -> Iterator[CompiledMachine]:
+    # Machines as the file is read, a block of whole lines at a time, so solving
+    # can start before the rest of the file has arrived.
+    pending = b""
+    for block in iter(partial(stream.read, block_size), b""):
+        complete, _, rest = (pending + block).rpartition(b"\n")
+        pending = rest
+        yield from load_machines(complete).compiled()
+    yield from load_machines(pending).compiled()
+
+
+def parse_input(data: str) -> list[Machine]:
+    return list(load_machines(data.encode()))
 
 
 def press_button(lights: frozenbitarray, button: list[int]) -> frozenbitarray:
@@ -49,28 +280,131 @@ def press_button(lights: frozenbitarray, button: list[int]) -> frozenbitarray:
                            for index, state in enumerate(lights)])
 
 
-def required_button_presses(machine: Machine) -> int:
-    press_count = 0
-    light_states = [frozenbitarray([False] * len(machine.target_lights))]
-    visited_configurations = set(light_states)
+def bitmask(indices: Iterable[int]) -> int:
+    mask = 0
+    for index in indices:
+        mask |= 1 << index
+    return mask
 
-    while True:
+
+def bfs_presses(target: int, masks: list[int], width: int) -> int:
+    # Breadth-first over light states held as ints, so a press is one XOR and the
+    # visited set is one byte per possible state.
+    if target == 0:
+        return 0
+    visited = bytearray(1 << width)
+    visited[0] = 1
+    light_states = [0]
+    press_count = 0
+    while light_states:
         press_count += 1
         new_light_states = []
         for light_state in light_states:
-            for button in machine.buttons:
-                new_state = press_button(light_state, button)
-                if new_state == machine.target_lights:
+            for mask in masks:
+                new_state = light_state ^ mask
+                if new_state == target:
                     return press_count
-                if new_state not in visited_configurations:
+                if not visited[new_state]:
+                    visited[new_state] = 1
                     new_light_states.append(new_state)
-                    visited_configurations.add(new_state)
         light_states = new_light_states
+    raise ValueError
+
+
+def eliminate(target: int, masks: list[int]) -> tuple[int, list[int]]:
+    # Gaussian elimination over GF(2), keeping an XOR basis of the button masks
+    # keyed by their highest light. Returns one set of buttons that reaches the
+    # target, and a basis of the button sets that leave every light unchanged,
+    # both as bitmasks over the buttons.
+    basis: dict[int, tuple[int, int]] = {}
+    null_basis = []
+    for button, button_mask in enumerate(masks):
+        mask = button_mask
+        combo = 1 << button
+        while mask and mask.bit_length() - 1 in basis:
+            pivot_mask, pivot_combo = basis[mask.bit_length() - 1]
+            mask ^= pivot_mask
+            combo ^= pivot_combo
+        if mask:
+            basis[mask.bit_length() - 1] = (mask, combo)
+        else:
+            null_basis.append(combo)
+
+    presses = 0
+    while target:
+        if target.bit_length() - 1 not in basis:
+            raise ValueError
+        pivot_mask, pivot_combo = basis[target.bit_length() - 1]
+        target ^= pivot_mask
+        presses ^= pivot_combo
+    return presses, null_basis
+
+
+def null_space_presses(target: int, masks: list[int]) -> int:
+    # No button is worth pressing twice, so the answer is the smallest set of
+    # buttons reaching the target: one solution combined with every mix of the
+    # sets that change nothing. The mixes are walked in Gray code order, one XOR
+    # apart, so memory stays constant however many there are.
+    presses, null_basis = eliminate(target, masks)
+    fewest = presses.bit_count()
+    for step in range(1, 1 << len(null_basis)):
+        presses ^= null_basis[(step & -step).bit_length() - 1]
+        fewest = min(fewest, presses.bit_count())
+    return fewest
+
+
+def meet_in_the_middle_presses(target: int, masks: list[int]) -> int:
+    # Breadth first from no lights and from the target at once, always growing the
+    # side with the smaller frontier by a press, until the two meet. Each side only
+    # goes about half the presses deep, so this stays quick for machines with so
+    # many buttons that both the light states and the null space are huge.
+    # Unreachable targets are turned away first, since neither side would ever
+    # run out before covering every state the buttons can reach.
+    eliminate(target, masks)
+    if target == 0:
+        return 0
+    seen = [{0: 0}, {target: 0}]
+    frontiers = [[0], [target]]
+    depths = [0, 0]
+    while True:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        here, there = seen[side], seen[1 - side]
+        depths[side] += 1
+        depth = depths[side]
+        next_frontier = []
+        for light_state in frontiers[side]:
+            for mask in masks:
+                new_state = light_state ^ mask
+                if new_state in there:
+                    # the other side has finished a whole level more than any
+                    # state it shares with this one, so the first meeting is best
+                    return depth + there[new_state]
+                if new_state not in here:
+                    here[new_state] = depth
+                    next_frontier.append(new_state)
+        frontiers[side] = next_frontier
+
+
+def fewest_presses(target: int, masks: list[int], width: int) -> int:
+    # The exact search with the least work for the machine's shape: breadth first
+    # over the light states the buttons reach, or the walk over the button sets
+    # that change nothing. When both are too big, there are many more buttons than
+    # independent ones, so few presses are needed and meeting in the middle is fast.
+    _, null_basis = eliminate(target, masks)
+    rank = len(masks) - len(null_basis)
+    bfs_steps = len(masks) << rank
+    walk_steps = 1 << len(null_basis)
+    if width <= BFS_MAX_LIGHTS and bfs_steps <= min(walk_steps, SEARCH_MAX_STEPS):
+        return bfs_presses(target, masks, width)
+    if walk_steps <= SEARCH_MAX_STEPS:
+        return null_space_presses(target, masks)
+    return meet_in_the_middle_presses(target, masks)
 
 
 def solve_min_sum_system(
     coefficients: list[list[int]],
     constants: list[int],
+    time_limit: float | None = None,
 ) -> int:
     # Convert inputs to numpy arrays
     a = np.array(coefficients, dtype=float)
@@ -92,34 +426,579 @@ def solve_min_sum_system(
     integrality = np.ones(a.shape[1], dtype=int)
 
     # Solve
-    res = milp(
-        c=c,
-        constraints=constraints,
-        bounds=positive_bounds,
-        integrality=integrality,
-    )
+    try:
+        res = milp(
+            c=c,
+            constraints=constraints,
+            bounds=positive_bounds,
+            integrality=integrality,
+            options={} if time_limit is None else {"time_limit": time_limit},
+        )
+    except ValueError as error:
+        # milp turns anything raised while it checks its arguments into a
+        # ValueError, including a TimeoutError from an alarm going off then
+        if isinstance(error.__cause__, TimeoutError):
+            raise error.__cause__ from None
+        raise
 
     if res.success:
         return sum(np.round(res.x).astype(int).tolist())
+    # status 1 is HiGHS stopping at its time or iteration limit, which says
+    # nothing about whether the machine can be solved
+    if res.status == 1:
+        raise TimeoutError
 
     raise ValueError
 
 
-def required_joltage_presses(machine: Machine) -> int:
+@dataclass
+class ReducedSystem:
+    # coefficients @ x == constants after elimination. Each row is
+    # [coefficients..., constant], positive in its own pivot column and zero in
+    # every other pivot column, so the free variables fix all the rest.
+    rows: list[list[int]]
+    pivots: list[int]
+    free: list[int]
+    # for 0/1 coefficients and nonnegative x, no variable can exceed the smallest
+    # constant its column touches
+    limits: list[int]
+
+
+@dataclass
+class Elimination:
+    # Fraction-free Gauss-Jordan elimination of a coefficient matrix in integers.
+    # The pivot rows come first, each positive in its own pivot column and zero in
+    # every other. The row operations are kept as an integer transform, so any
+    # constants can be reduced the same way later.
+    rows: list[list[int]]
+    pivots: list[int]
+    transform: list[list[int]]
+
+
+def eliminate_rows(coefficients: list[list[int]]) -> Elimination:
+    width = len(coefficients[0]) if coefficients else 0
+    rows = [[*row, *(int(i == j) for j in range(len(coefficients)))]
+            for i, row in enumerate(coefficients)]
+    pivots: list[int] = []
+    for col in range(width):
+        found = next((i for i in range(len(pivots), len(rows)) if rows[i][col]), None)
+        if found is None:
+            continue
+        top = len(pivots)
+        rows[top], rows[found] = rows[found], rows[top]
+        pivot = rows[top] if rows[top][col] > 0 else [-a for a in rows[top]]
+        rows[top] = pivot
+        for i, row in enumerate(rows):
+            if i != top and row[col]:
+                reduced = [pivot[col] * a - row[col] * p
+                           for a, p in zip(row, pivot, strict=True)]
+                divisor = math.gcd(*reduced)
+                rows[i] = [a // divisor for a in reduced] if divisor > 1 else reduced
+        pivots.append(col)
+    return Elimination([row[:width] for row in rows], pivots,
+                       [row[width:] for row in rows])
+
+
+def reduce_system(
+    coefficients: list[list[int]],
+    constants: list[int],
+    elimination: Elimination | None = None,
+) -> ReducedSystem:
+    if elimination is None:
+        elimination = eliminate_rows(coefficients)
+    reduced = [sum(t * c for t, c in zip(row, constants, strict=True))
+               for row in elimination.transform]
+    rank = len(elimination.pivots)
+    if any(reduced[rank:]):
+        raise ValueError
+
+    width = len(coefficients[0]) if coefficients else 0
+    limits = [min((constant for row, constant in zip(coefficients, constants,
+                                                     strict=True) if row[col]),
+                  default=0)
+              for col in range(width)]
+    free = [col for col in range(width) if col not in set(elimination.pivots)]
+    rows = [[*row, constant]
+            for row, constant in zip(elimination.rows[:rank], reduced[:rank],
+                                     strict=True)]
+    return ReducedSystem(rows, elimination.pivots, free, limits)
+
+
+def term_range(coefficient: int, low: int, high: int) -> tuple[int, int]:
+    # The integers x with low <= coefficient * x <= high, for a nonzero coefficient.
+    if coefficient > 0:
+        return -(-low // coefficient), high // coefficient
+    return -(high // -coefficient), -low // -coefficient
+
+
+def free_ranges(system: ReducedSystem) -> list[tuple[int, int]]:
+    # Ranges for the free variables, narrowed until no row narrows them further.
+    # A row's pivot variable has to stay within 0 and its limit, which bounds
+    # the sum of the row's free terms, and so each free term given the others.
+    ranges = [(0, system.limits[col]) for col in system.free]
+    changed = True
+    while changed:
+        changed = False
+        for row, pivot in zip(system.rows, system.pivots, strict=True):
+            terms = [(row[col] * lo, row[col] * hi) for col, (lo, hi) in
+                     zip(system.free, ranges, strict=True)]
+            least = sum(min(term) for term in terms)
+            most = sum(max(term) for term in terms)
+            low = row[-1] - row[pivot] * system.limits[pivot]
+            for i, col in enumerate(system.free):
+                if not row[col]:
+                    continue
+                lo, hi = term_range(row[col], low - most + max(terms[i]),
+                                    row[-1] - least + min(terms[i]))
+                narrowed = (max(lo, ranges[i][0]), min(hi, ranges[i][1]))
+                if narrowed[0] > narrowed[1]:
+                    raise ValueError
+                if narrowed != ranges[i]:
+                    ranges[i] = narrowed
+                    changed = True
+    return ranges
+
+
+class FreeVariableSearch:
+    # Depth-first branch and bound over the free variables of a reduced system,
+    # for the least sum over all variables. That sum, times the lcm of the pivot
+    # entries, is an integer linear function of the free variables, so each level
+    # walks its range cheapest first and stops once the best case for the rest
+    # can't beat the best found.
+    def __init__(self, system: ReducedSystem, ranges: list[tuple[int, int]]) -> None:
+        self.system = system
+        self.ranges = ranges
+        rows = list(zip(system.rows, system.pivots, strict=True))
+        self.scale = math.lcm(*(row[pivot] for row, pivot in rows))
+        self.weights = [self.scale - sum(row[col] * (self.scale // row[pivot])
+                                         for row, pivot in rows)
+                        for col in system.free]
+        self.base = sum(row[-1] * (self.scale // row[pivot]) for row, pivot in rows)
+        # the least and most the free variables from each depth on can add to each
+        # row, and the least they can add to the scaled sum
+        depths = len(system.free) + 1
+        self.row_least = [[0] * len(rows) for _ in range(depths)]
+        self.row_most = [[0] * len(rows) for _ in range(depths)]
+        self.weight_least = [0] * depths
+        for depth in reversed(range(depths - 1)):
+            col = system.free[depth]
+            lo, hi = ranges[depth]
+            for r, (row, _) in enumerate(rows):
+                terms = (row[col] * lo, row[col] * hi)
+                self.row_least[depth][r] = self.row_least[depth + 1][r] + min(terms)
+                self.row_most[depth][r] = self.row_most[depth + 1][r] + max(terms)
+            self.weight_least[depth] = (self.weight_least[depth + 1] +
+                                        min(self.weights[depth] * lo,
+                                            self.weights[depth] * hi))
+        # rows whose pivot variable isn't automatically a whole number
+        self.fractional = [(r, pivot) for r, (row, pivot) in enumerate(rows)
+                           if row[pivot] > 1]
+        self.best: int | None = None
+
+    def values(self, depth: int, residuals: list[int]) -> range:
+        # The values for this depth's variable that leave every pivot variable
+        # able to land within its limits, ordered cheapest first.
+        system = self.system
+        col = system.free[depth]
+        lo, hi = self.ranges[depth]
+        for r, (row, pivot) in enumerate(zip(system.rows, system.pivots,
+                                             strict=True)):
+            high = residuals[r] - self.row_least[depth + 1][r]
+            low = (residuals[r] - row[pivot] * system.limits[pivot] -
+                   self.row_most[depth + 1][r])
+            if row[col]:
+                row_lo, row_hi = term_range(row[col], low, high)
+                lo, hi = max(lo, row_lo), min(hi, row_hi)
+            elif low > 0 or high < 0:
+                return range(0)
+        return range(lo, hi + 1) if self.weights[depth] >= 0 else range(hi, lo - 1, -1)
+
+    def whole(self, residuals: list[int]) -> bool:
+        # Whether these residuals leave every pivot variable a whole number.
+        return all(residuals[r] % self.system.rows[r][pivot] == 0
+                   for r, pivot in self.fractional)
+
+    def search(self, depth: int, residuals: list[int], scaled: int) -> None:
+        system = self.system
+        col = system.free[depth]
+        last = depth == len(system.free) - 1
+        for value in self.values(depth, residuals):
+            scaled_here = scaled + self.weights[depth] * value
+            if (self.best is not None and scaled_here + self.weight_least[depth + 1]
+                    >= self.best * self.scale):
+                break
+            rest = [res - row[col] * value
+                    for res, row in zip(residuals, system.rows, strict=True)]
+            if not last:
+                self.search(depth + 1, rest, scaled_here)
+            elif self.whole(rest):
+                # the range already keeps every pivot variable within its limits,
+                # and later values only cost more
+                self.best = scaled_here // self.scale
+                break
+
+
+def integer_min_sum(
+    coefficients: list[list[int]],
+    constants: list[int],
+    elimination: Elimination | None = None,
+) -> int | None:
+    # Exact minimum of sum(x) for coefficients @ x == constants over nonnegative
+    # integers, when coefficients are all 0 or 1. None if there are too many free
+    # variables for the search to be quick.
+    system = reduce_system(coefficients, constants, elimination)
+    if len(system.free) > MAX_FREE_VARIABLES:
+        return None
+    # the last level settles in one step, so it gets the widest range
+    ranges = free_ranges(system)
+    order = sorted(range(len(ranges)), key=lambda i: ranges[i][1] - ranges[i][0])
+    system.free = [system.free[i] for i in order]
+    search = FreeVariableSearch(system, [ranges[i] for i in order])
+    residuals = [row[-1] for row in system.rows]
+    if not system.free:
+        if search.whole(residuals) and all(res >= 0 for res in residuals):
+            return search.base // search.scale
+        raise ValueError
+    search.search(0, residuals, search.base)
+    if search.best is None:
+        raise ValueError
+    return search.best
+
+
+class LRUCache[K, V]:
+    # Entries dropping the least recently used once their total weight passes
+    # maxsize, each weighing 1 unless weigh says otherwise, with counts of
+    # lookups that found an entry and ones that had to build it, and the keys
+    # it built.
+    def __init__(self, maxsize: int, weigh: Callable[[V], int] | None = None) -> None:
+        self.entries: OrderedDict[K, V] = OrderedDict()
+        self.maxsize = maxsize
+        self.weigh = weigh
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.built: set[K] = set()
+
+    def get(self, key: K, build: Callable[[], V]) -> V:
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        value = build()
+        self.put(key, value)
+        self.built.add(key)
+        return value
+
+    def weight(self, value: V) -> int:
+        return 1 if self.weigh is None else self.weigh(value)
+
+    def put(self, key: K, value: V) -> None:
+        if key in self.entries:
+            self.size -= self.weight(self.entries[key])
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.size += self.weight(value)
+        while self.size > self.maxsize:
+            _, dropped = self.entries.popitem(last=False)
+            self.size -= self.weight(dropped)
+
+    def update(self, other: "LRUCache[K, V]") -> None:
+        for key, value in other.entries.items():
+            self.put(key, value)
+        self.hits += other.hits
+        self.misses += other.misses
+
+    def subset(self, keys: Iterable[K]) -> "LRUCache[K, V]":
+        # just the entries for these keys, with nothing counted or built yet
+        chosen: LRUCache[K, V] = LRUCache(self.maxsize, self.weigh)
+        for key in keys:
+            if key in self.entries:
+                chosen.put(key, self.entries[key])
+        return chosen
+
+    def changes(self) -> "LRUCache[K, V]":
+        # the lookups and the entries built here, for update
+        changed: LRUCache[K, V] = LRUCache(self.maxsize, self.weigh)
+        for key, value in self.entries.items():
+            if key in self.built:
+                changed.put(key, value)
+        changed.hits = self.hits
+        changed.misses = self.misses
+        return changed
+
+
+class WiringCache:
+    # Per-wiring work shared by every machine wired the same way: each light
+    # state's fewest presses for part one, and the eliminated system for part two,
+    # along with part two answers for joltage targets seen before. Wirings seen
+    # only once so far are just noted, without a table.
+    def __init__(self, maxsize: int = CACHE_SIZE,
+                 table_bytes: int = TABLE_CACHE_BYTES) -> None:
+        self.seen: LRUCache[Wiring, None] = LRUCache(maxsize)
+        self.lights: LRUCache[Wiring, bytes] = LRUCache(table_bytes, len)
+        self.joltage: LRUCache[Wiring, Elimination] = LRUCache(maxsize)
+        self.presses: LRUCache[tuple[Wiring, tuple[int, ...]], int] = LRUCache(maxsize)
+
+    def update(self, other: "WiringCache") -> None:
+        self.seen.update(other.seen)
+        self.lights.update(other.lights)
+        self.joltage.update(other.joltage)
+        self.presses.update(other.presses)
+
+    def subset(self, machines: list[CompiledMachine]) -> "WiringCache":
+        # Only the entries these machines could look up, which is all a worker
+        # solving them needs to be sent.
+        lights = [canonical_wiring(machine.buttons, machine.width)
+                  for machine in machines]
+        joltage = [canonical_wiring(machine.buttons, len(machine.joltage))
+                   for machine in machines]
+        chosen = WiringCache(self.seen.maxsize, self.lights.maxsize)
+        chosen.seen = self.seen.subset(lights)
+        chosen.lights = self.lights.subset(lights)
+        chosen.joltage = self.joltage.subset(joltage)
+        chosen.presses = self.presses.subset(
+            (wiring, tuple(machine.joltage))
+            for wiring, machine in zip(joltage, machines, strict=True))
+        return chosen
+
+    def changes(self) -> "WiringCache":
+        changed = WiringCache(self.seen.maxsize, self.lights.maxsize)
+        changed.seen = self.seen.changes()
+        changed.lights = self.lights.changes()
+        changed.joltage = self.joltage.changes()
+        changed.presses = self.presses.changes()
+        return changed
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps({
+            "seen": [[width, masks] for width, masks in self.seen.entries],
+            "lights": [[width, masks, table.hex()] for (width, masks), table
+                       in self.lights.entries.items()],
+            "joltage": [[width, masks, asdict(elimination)] for (width, masks),
+                        elimination in self.joltage.entries.items()],
+            "presses": [[width, masks, targets, presses] for ((width, masks),
+                        targets), presses in self.presses.entries.items()],
+        }))
+
+    @classmethod
+    def load(cls, path: Path, maxsize: int = CACHE_SIZE,
+             table_bytes: int = TABLE_CACHE_BYTES) -> "WiringCache":
+        saved = json.loads(path.read_text())
+        cache = cls(maxsize, table_bytes)
+        for width, masks in saved.get("seen", []):
+            cache.seen.put((width, tuple(masks)), None)
+        for width, masks, table in saved["lights"]:
+            cache.lights.put((width, tuple(masks)), bytes.fromhex(table))
+        for width, masks, elimination in saved["joltage"]:
+            cache.joltage.put((width, tuple(masks)), Elimination(**elimination))
+        for width, masks, targets, presses in saved["presses"]:
+            cache.presses.put(((width, tuple(masks)), tuple(targets)), presses)
+        return cache
+
+
+def canonical_wiring(buttons: list[int], width: int) -> Wiring:
+    # The light count and the distinct, nonempty button masks in order. Duplicate
+    # buttons and ones that touch no light never lower the fewest presses, so
+    # machines that differ only in those share an entry. Bits past the last light
+    # don't touch anything.
+    full = (1 << width) - 1
+    return width, tuple(sorted({button & full for button in buttons} - {0}))
+
+
+def distance_table(wiring: Wiring) -> bytes:
+    # The fewest presses to reach every light state, breadth first a whole level
+    # at a time, with UNREACHABLE for states no presses reach.
+    width, masks = wiring
+    table = np.full(1 << width, UNREACHABLE, dtype=np.uint8)
+    table[0] = 0
+    frontier = np.zeros(1, dtype=np.int64)
+    presses = np.array(masks, dtype=np.int64)
+    distance = 0
+    while len(frontier):
+        distance += 1
+        reached = np.unique(frontier[:, None] ^ presses[None, :])
+        frontier = reached[table[reached] == UNREACHABLE]
+        table[frontier] = distance
+    return table.tobytes()
+
+
+def cached_table(cache: WiringCache, wiring: Wiring) -> bytes | None:
+    # A wiring's distance table from its second sighting on. The first time it is
+    # only noted: one machine is solved far quicker on its own than every light
+    # state is, so the table is only worth building for a wiring that repeats.
+    if wiring in cache.lights.entries or wiring in cache.seen.entries:
+        return cache.lights.get(wiring, lambda: distance_table(wiring))
+    cache.seen.get(wiring, lambda: None)
+    return None
+
+
+def required_button_presses(machine: CompiledMachine,
+                            cache: WiringCache | None = None) -> int:
+    target = machine.lights
+    wiring = canonical_wiring(machine.buttons, machine.width)
+    width, masks = wiring
+    table = None
+    if cache is not None and width <= TABLE_MAX_LIGHTS:
+        table = cached_table(cache, wiring)
+    if table is not None:
+        presses = table[target]
+        if presses == UNREACHABLE:
+            raise ValueError
+        return presses
+    return fewest_presses(target, list(masks), width)
+
+
+def min_joltage_presses(coefficients: list[list[int]], constants: list[int],
+                        elimination: Elimination | None,
+                        deadline: float | None) -> int:
+    # MILP only gets whatever time the integer search left before the deadline.
+    presses = integer_min_sum(coefficients, constants, elimination)
+    if presses is not None:
+        return presses
+    if deadline is None:
+        return solve_min_sum_system(coefficients, constants)
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError
+    return solve_min_sum_system(coefficients, constants, remaining)
+
+
+def required_joltage_presses(machine: CompiledMachine, time_limit: float | None = None,
+                             cache: WiringCache | None = None) -> int:
     constants = machine.joltage
-    coefficients = [
-        [1 if j_idx in button else 0 for button in machine.buttons]
-            for j_idx in range(len(constants))
-    ]
-    return solve_min_sum_system(coefficients, constants)
+    wiring = canonical_wiring(machine.buttons, len(constants))
+    coefficients = [[mask >> light & 1 for mask in wiring[1]]
+                    for light in range(len(constants))]
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    if cache is None:
+        return min_joltage_presses(coefficients, constants, None, deadline)
+    joltage = cache.joltage
+    return cache.presses.get((wiring, tuple(constants)), lambda: min_joltage_presses(
+        coefficients, constants,
+        joltage.get(wiring, lambda: eliminate_rows(coefficients)), deadline))
 
 
 def part_one(machines: list[Machine]) -> int:
-    return sum(required_button_presses(machine) for machine in machines)
+    cache = WiringCache()
+    return sum(required_button_presses(machine.compile(), cache)
+               for machine in machines)
 
 
 def part_two(machines: list[Machine]) -> int:
-    return sum(required_joltage_presses(machine) for machine in machines)
+    cache = WiringCache()
+    return sum(required_joltage_presses(machine.compile(), cache=cache)
+               for machine in machines)
+
+
+def machine_size(machine: CompiledMachine) -> int:
+    return len(machine.buttons) * max(machine.width, 1)
+
+
+def raise_timeout(_signum: int, _frame: FrameType | None) -> None:
+    raise TimeoutError
+
+
+def solve_batch(part: int, batch: Iterable[tuple[int, CompiledMachine]],
+                timeout: float | None,
+                cache: WiringCache) -> tuple[int, list[Failure]]:
+    # Solves machines one at a time, each with its own alarm when there's a
+    # timeout, and reports a machine that fails rather than giving up on the rest.
+    # Without a timeout no alarm is set up at all, since SIGALRM only exists on
+    # Unix and can only be handled from the main thread.
+    if timeout is None:
+        return solve_each(part, batch, None, cache)
+    previous = signal.signal(signal.SIGALRM, raise_timeout)
+    try:
+        return solve_each(part, batch, timeout, cache)
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+
+
+def solve_each(part: int, batch: Iterable[tuple[int, CompiledMachine]],
+               timeout: float | None,
+               cache: WiringCache) -> tuple[int, list[Failure]]:
+    total = 0
+    failures = []
+    for index, machine in batch:
+        try:
+            presses = solve_one(part, machine, timeout, cache)
+        except TimeoutError:
+            failures.append(Failure(index, "timed out"))
+        except ValueError:
+            failures.append(Failure(index, "has no solution"))
+        else:
+            total += presses
+    return total, failures
+
+
+def solve_one(part: int, machine: CompiledMachine, timeout: float | None,
+              cache: WiringCache) -> int:
+    # The alarm is cancelled as soon as the solver returns or raises, so it can't
+    # go off while the result is being recorded. If it goes off just before that,
+    # the TimeoutError still comes out of here, where solve_each is waiting for it.
+    if timeout is not None:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        if part == 1:
+            return required_button_presses(machine, cache)
+        return required_joltage_presses(machine, timeout, cache)
+    finally:
+        if timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def solve_remote(part: int, batch: list[tuple[int, CompiledMachine]],
+                 timeout: float | None,
+                 cache: WiringCache) -> tuple[int, list[Failure], WiringCache]:
+    # solve_batch in a worker, sending back only the lookups it made and the
+    # entries it built, since the cache it was sent holds the parent's entries
+    # for these machines
+    total, failures = solve_batch(part, batch, timeout, cache)
+    return total, failures, cache.changes()
+
+
+def balanced_batches(machines: list[CompiledMachine],
+                     count: int) -> list[list[tuple[int, CompiledMachine]]]:
+    # Deals machines out largest first, each to the batch with the least work so
+    # far, and returns the batches heaviest first so the slowest start earliest.
+    loads = [(0, batch) for batch in range(count)]
+    batches: list[list[tuple[int, CompiledMachine]]] = [[] for _ in range(count)]
+    order = sorted(range(len(machines)), key=lambda i: -machine_size(machines[i]))
+    for index in order:
+        load, batch = heapq.heappop(loads)
+        batches[batch].append((index, machines[index]))
+        heapq.heappush(loads, (load + machine_size(machines[index]), batch))
+    heaviest = sorted(loads, reverse=True)
+    return [batches[batch] for _, batch in heaviest if batches[batch]]
+
+
+def solve_machines(machines: Iterable[CompiledMachine], part: int, jobs: int = 1,
+                   timeout: float | None = None,
+                   cache: WiringCache | None = None) -> tuple[int, list[Failure]]:
+    # The total over every machine that could be solved, and the failures in
+    # machine order. With more than one job, batches go to a process pool, each
+    # sent the cache entries for its own machines, with what it built merged back
+    # when it finishes. One job solves machines as they come, so they can be read
+    # lazily.
+    if cache is None:
+        cache = WiringCache()
+    if jobs <= 1:
+        return solve_batch(part, enumerate(machines), timeout, cache)
+    total = 0
+    failures: list[Failure] = []
+    machines = list(machines)
+    batches = balanced_batches(machines, min(len(machines), jobs * BATCHES_PER_JOB))
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = [pool.submit(solve_remote, part, batch, timeout,
+                               cache.subset([machine for _, machine in batch]))
+                   for batch in batches]
+        for future in as_completed(futures):
+            batch_total, batch_failures, batch_cache = future.result()
+            total += batch_total
+            failures.extend(batch_failures)
+            cache.update(batch_cache)
+    return total, sorted(failures, key=lambda failure: failure.index)
 
 
 def test_press_buttons() -> None:
@@ -127,6 +1006,34 @@ def test_press_buttons() -> None:
         frozenbitarray([False, True, True])
 
 
+def test_null_space_presses() -> None:
+    with Path("example.txt").open() as f:
+        machines = parse_input(f.read())
+    for machine in machines:
+        width = len(machine.target_lights)
+        target = bitmask(i for i, state in enumerate(machine.target_lights) if state)
+        masks = [bitmask(button) for button in machine.buttons]
+        assert null_space_presses(target, masks) == bfs_presses(target, masks, width)
+
+
+def test_fewest_presses() -> None:
+    rng = np.random.default_rng(10)
+    for _ in range(50):
+        width = int(rng.integers(1, 11))
+        masks = rng.integers(1 << width, size=int(rng.integers(1, 15))).tolist()
+        target = int(rng.integers(1 << width))
+        try:
+            expected = bfs_presses(target, masks, width)
+        except ValueError:
+            continue
+        assert meet_in_the_middle_presses(target, masks) == expected
+        assert fewest_presses(target, masks, width) == expected
+    # far too many light states and null-space mixes to walk through
+    masks = rng.integers(1 << 30, size=56).tolist()
+    target = masks[3] ^ masks[17] ^ masks[40] ^ masks[51]
+    assert 1 <= fewest_presses(target, masks, 30) <= 4
+
+
 def test_part_one() -> None:
     with Path("example.txt").open() as f:
         data = parse_input(f.read())
@@ -139,9 +1046,147 @@ def test_part_two() -> None:
     assert part_two(data) == 33
 
 
+def test_integer_min_sum() -> None:
+    # pytest is only a dev dependency, so it isn't needed to run the solution
+    import pytest  # noqa: PLC0415
+
+    with Path("example.txt").open() as f:
+        machines = parse_input(f.read())
+    for machine in machines:
+        coefficients = [[1 if light in button else 0 for button in machine.buttons]
+                        for light in range(len(machine.joltage))]
+        assert integer_min_sum(coefficients, machine.joltage) == \
+            solve_min_sum_system(coefficients, machine.joltage)
+    # half a press of each button would do, but no whole number of presses
+    triangle = [[1, 0, 1], [1, 1, 0], [0, 1, 1]]
+    with pytest.raises(ValueError):  # noqa: PT011
+        integer_min_sum(triangle, [1, 1, 1])
+
+
+def test_solve_machines() -> None:
+    with Path("example.txt").open() as f:
+        machines = [machine.compile() for machine in parse_input(f.read())]
+    unsolvable = Machine(frozenbitarray([True, False]), [[1]], [1, 2]).compile()
+    machines.insert(1, unsolvable)
+    assert solve_machines(machines, 1) == (7, [Failure(1, "has no solution")])
+    assert solve_machines(machines, 2, jobs=2) == (33, [Failure(1, "has no solution")])
+    # no alarm is needed without a timeout, so any thread can solve
+    with ThreadPoolExecutor(1) as pool:
+        assert pool.submit(solve_machines, machines, 1).result() == \
+            (7, [Failure(1, "has no solution")])
+
+
+def test_solve_timeout() -> None:
+    import pytest  # noqa: PLC0415
+
+    # too many free variables for the integer search, so it goes to MILP, and far
+    # too little time for that
+    rng = np.random.default_rng(22)
+    buttons = [np.flatnonzero(rng.random(12) < 0.3).tolist() or [0] for _ in range(30)]
+    presses = rng.integers(0, 20, size=30)
+    coefficients = [[int(light in button) for button in buttons] for light in range(12)]
+    joltage = [int(np.dot(row, presses)) for row in coefficients]
+    assert solve_min_sum_system(coefficients, joltage) == 174
+    with pytest.raises(TimeoutError):
+        solve_min_sum_system(coefficients, joltage, 1e-6)
+    machine = Machine(frozenbitarray(12), buttons, joltage).compile()
+    assert solve_machines([machine], 2, timeout=1e-3) == \
+        (0, [Failure(0, "timed out")])
+
+
+def test_load_machines() -> None:
+    with Path("example.txt").open("rb") as f:
+        store = load_machines(f.read())
+    assert len(store) == 3
+    assert store.lights[0] == 0b0110
+    assert store[0] == Machine(frozenbitarray("0110"),
+                               [[3], [1, 3], [2], [2, 3], [0, 2], [0, 1]], [3, 5, 4, 7])
+    # blocks that end mid-line, and a line with no diagram, which is skipped
+    assert list(store.compiled()) == [machine.compile() for machine in store]
+    with Path("example.txt").open("rb") as f:
+        assert list(iter_machines(f, block_size=16)) == list(store.compiled())
+    assert parse_input("(0) {1}\n\n[#] (0)\n") == \
+        [Machine(frozenbitarray("1"), [[0]], [])]
+
+
+def test_wiring_cache(tmp_path: Path) -> None:
+    with Path("example.txt").open() as f:
+        machines = parse_input(f.read())
+    # the same wiring with a duplicate button, and with the buttons reordered
+    machines.append(Machine(machines[0].target_lights,
+                            [*machines[0].buttons, machines[0].buttons[0]],
+                            machines[0].joltage))
+    machines.append(Machine(frozenbitarray("0110"), machines[0].buttons[::-1],
+                            [1, 2, 2, 3]))
+    compiled = [machine.compile() for machine in machines]
+    cache = WiringCache()
+    expected = part_one(machines)
+    assert sum(required_button_presses(m, cache) for m in compiled) == expected
+    # only the wiring that repeats gets a table, from its second sighting
+    assert cache.seen.misses == 3
+    assert (cache.lights.hits, cache.lights.misses) == (1, 1)
+    assert len(cache.lights.entries) == 1
+
+    cache.save(tmp_path / "cache.json")
+    loaded = WiringCache.load(tmp_path / "cache.json")
+    assert solve_machines(compiled, 1, cache=loaded) == (expected, [])
+    assert solve_machines(compiled, 2, cache=loaded) == (part_two(machines), [])
+    assert (loaded.lights.hits, loaded.lights.misses) == (3, 2)
+    assert (loaded.presses.hits, loaded.presses.misses) == (1, 4)
+    assert (loaded.joltage.hits, loaded.joltage.misses) == (1, 3)
+
+    # workers send back only their own lookups and the entries they built
+    assert solve_machines(compiled, 1, jobs=2, cache=loaded) == (expected, [])
+    assert solve_machines(compiled, 2, jobs=2, cache=loaded) == (part_two(machines), [])
+    assert (loaded.lights.hits, loaded.lights.misses) == (8, 2)
+    assert (loaded.presses.hits, loaded.presses.misses) == (6, 4)
+    fresh = WiringCache()
+    assert solve_machines(compiled, 1, jobs=2, cache=fresh) == (expected, [])
+    assert fresh.seen.misses + fresh.lights.hits + fresh.lights.misses == \
+        len(machines)
+    assert len(fresh.seen.entries) == 3
+    # a worker is only sent the entries for its own machines
+    sent = loaded.subset(compiled[1:3])
+    assert (len(sent.lights.entries), len(sent.presses.entries)) == (2, 2)
+
+    # the light tables are bounded by their total size, here 16, 32 and 64 bytes
+    bounded = WiringCache.load(tmp_path / "cache.json", table_bytes=96)
+    assert solve_machines(compiled, 1, cache=bounded) == (expected, [])
+    assert (len(bounded.lights.entries), bounded.lights.size) == (2, 80)
+
+
 if __name__ == "__main__":
-    with Path("input.txt").open() as f:
-        data = parse_input(f.read())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of processes to solve machines in")
+    parser.add_argument("--timeout", type=float,
+                        help="seconds to allow for any one machine")
+    parser.add_argument("--cache", type=Path,
+                        help="file to keep per-wiring work in between runs")
+    parser.add_argument("--stream", action="store_true",
+                        help="solve machines as the input is read, once per part")
+    args = parser.parse_args()
+
+    store = None
+    if not args.stream:
+        with Path("input.txt").open("rb") as f:
+            store = load_machines(f.read())
 
-    print(f"Part 1: {part_one(data)}")
-    print(f"Part 2: {part_two(data)}")
+    cache = WiringCache()
+    if args.cache is not None and args.cache.exists():
+        cache = WiringCache.load(args.cache)
+    for part in (1, 2):
+        with Path("input.txt").open("rb") as f:
+            machines = iter_machines(f) if store is None else store.compiled()
+            total, failures = solve_machines(machines, part, args.jobs, args.timeout,
+                                             cache)
+        for failure in failures:
+            print(f"Part {part}: machine {failure.index} {failure.reason}",
+                  file=sys.stderr)
+        print(f"Part {part}: {total}")
+    if args.cache is not None:
+        cache.save(args.cache)
+        for name, lookups in (("lights", cache.lights), ("joltage", cache.joltage),
+                              ("presses", cache.presses)):
+            print(f"Cache ({name}): {lookups.hits} hits, {lookups.misses} misses",
+                  file=sys.stderr)